@@ -320,12 +320,8 @@ export function DetectionPage({ onDetection }) {
         // Convert to blob and send as binary to backend
         canvas.toBlob((blob) => {
           if (blob) {
-            // Send binary blob directly via Socket.IO
-            emit('process_frame_binary', {
-              frame: blob,
-              width: canvas.width,
-              height: canvas.height
-            });
+            // Send the JPEG blob itself as the binary Socket.IO payload
+            emit('process_frame_binary', blob);
           }
         }, 'image/jpeg', 0.8);
       };
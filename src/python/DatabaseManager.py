@@ -1,92 +1,111 @@
 import sqlite3
+import threading
 import pandas as pd
 from utils import *
 import os
 month2number={'JAN':'01','FEB':'02','MAR':'03','APR':'04','MAY':'05','JUN':'06','JUL':'07','AUG':'08','SEP':'09','OCT':'10','NOV':'11','DEC':'12'}
+# hot queries kept as constants so every call hits the connection's statement cache
+_Q_INSERT_PERSON="INSERT INTO PERSON (Id,Name,Title) VALUES (?, ?, ?) ON CONFLICT(Id) DO NOTHING"
+_Q_ID_FROM_NAME="SELECT Id FROM PERSON WHERE Name = ?"
+_Q_NAME_FROM_ID="SELECT Name FROM PERSON WHERE Id = ?"
+_Q_TITLE_FROM_ID="SELECT Title FROM PERSON WHERE Id = ?"
+_Q_NAME_TITLE_FROM_ID="SELECT Name, Title FROM PERSON WHERE Id = ?"
+_Q_PERSON_IDS="SELECT Id FROM PERSON"
+_Q_PERSON_INFO="SELECT Id, Name, Title FROM PERSON"
+_Q_LAST_ENTRY="SELECT * FROM ATTENDANCE WHERE Id = ? AND Date = ? AND Status = ? ORDER BY rowid DESC LIMIT 1"
 class MySqlite3Manager:
     def __init__(self):
         self.dbname="system/Attendance.db"
+        # each thread keeps its own persistent connection; WAL lets them read concurrently
+        self._tls=threading.local()
         self.create_database()
-        self.create_table_admin()
-        self.create_table_person()
-        self.insert_into_admin()
+        self.create_tables()
     def connect(self):
-        self.con=sqlite3.connect(self.dbname)
-        self.cursor=self.con.cursor() 
+        con = getattr(self._tls, 'con', None)
+        if con is None:
+            con=sqlite3.connect(self.dbname, isolation_level=None, cached_statements=256)
+            # WAL lets readers run alongside the writer; NORMAL skips the fsync on every commit
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            con.execute("PRAGMA temp_store=MEMORY")
+            con.execute("PRAGMA cache_size=-64000")
+            con.execute("PRAGMA mmap_size=268435456")
+            self._tls.con = con
+        return con
     def connect_link(self):
-        self.con=sqlite3.connect(self.dbname)
-        self.cursor=self.con.cursor()  
+        self.connect()
         print('database created')
     def create_database(self):
         self.connect_link()
-        self.con.close()
-    
-    
-    def create_table_admin(self):
-        self.connect()
-        command = '''CREATE TABLE ADMIN(Name TEXT, ID TEXT,Password TEXT)'''
-        try:
-            self.cursor.execute(command)
-            self.con.commit()
-            print('Admin table created')
-        except Exception as e:
-            print(e)
-    def create_table_person(self):
-        self.connect()
-        command = f'''CREATE TABLE PERSON(Id TEXT, Name TEXT, Title TEXT)'''
+
+
+    def create_tables(self, username="admin",ID_="admin",password='1234'):
+        # idempotent schema setup and admin seed in one transaction, so restarts raise nothing
+        con = self.connect()
+        cursor = con.cursor()
+        commands = ["CREATE TABLE IF NOT EXISTS ADMIN(Name TEXT, ID TEXT PRIMARY KEY,Password TEXT)",
+                    "CREATE TABLE IF NOT EXISTS PERSON(Id TEXT PRIMARY KEY, Name TEXT, Title TEXT)",
+                    # unique indexes also cover databases created before Id/ID became primary keys
+                    "CREATE UNIQUE INDEX IF NOT EXISTS idx_person_id ON PERSON(Id)",
+                    "CREATE UNIQUE INDEX IF NOT EXISTS idx_admin_id ON ADMIN(ID)"]
+        attendance_commands = ["CREATE INDEX IF NOT EXISTS idx_att_id_date_status ON ATTENDANCE(Id, Date, Status)",
+                               "CREATE INDEX IF NOT EXISTS idx_att_date ON ATTENDANCE(Date)"]
         try:
-            self.cursor.execute(command)
-            self.con.commit()
-            print('Person table created')
+            cursor.execute("BEGIN")
+            for command in commands:
+                cursor.execute(command)
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='ATTENDANCE'")
+            if cursor.fetchone() is not None:
+                for command in attendance_commands:
+                    cursor.execute(command)
+            cursor.execute("INSERT OR IGNORE INTO ADMIN (Name,ID,Password) VALUES (?, ?, ?)", (username,ID_,password))
+            cursor.execute("COMMIT")
+            print('Admin and Person tables ready')
         except Exception as e:
+            if con.in_transaction:
+                cursor.execute("ROLLBACK")
             print(e)
 
-    
-    
+
+
     def insert_into_admin(self, username="admin",ID_="admin",password='1234'):
-        self.connect()
+        con = self.connect()
+        cursor = con.cursor()
         command = f"SELECT * FROM ADMIN WHERE ID = ?"
-        self.cursor.execute(command, (ID_,))
-        rows = self.cursor.fetchall()
-        if rows:
+        row = cursor.execute(command, (ID_,)).fetchone()
+        if row is not None:
             pass
         else:
             command_insertvalue = "insert into ADMIN (Name,ID,Password) values (?, ?,?)"
             try:
-                self.cursor.execute(command_insertvalue, (username,ID_,password))
-                self.con.commit()
-                self.con.close()
+                cursor.execute(command_insertvalue, (username,ID_,password))
+                con.commit()
                 print('data entered in admin table')
             except Exception as e:
                 print(e)
     def insert_into_person(self, id_, name, title):
-        self.connect()
-        command = "SELECT * FROM PERSON WHERE (Id) = ? "
-        self.cursor.execute(command, (id_,))
-        rows = self.cursor.fetchall()
-        if rows:
-            return "Id already exist"
-        command_insertvalue = f"insert into PERSON (Id,Name,Title) values (?, ?, ?)"
+        con = self.connect()
+        cursor = con.cursor()
         try:
-            self.cursor.execute(command_insertvalue, (id_,name,title))
-            self.con.commit()
-            self.con.close()
+            cursor.execute(_Q_INSERT_PERSON, (id_,name,title))
+            con.commit()
+            if cursor.rowcount == 0:
+                return "Id already exist"
             return "New person Added"
         except Exception as e:
             print(e)
-    
-    
-      
-    
-    
-    
+
+
+
+
+
+
     def authenticate_admin(self,id_,upassword):
-        self.connect()
+        con = self.connect()
+        cursor = con.cursor()
         command = "SELECT * FROM ADMIN WHERE (ID) = ? "
-        self.cursor.execute(command, (id_,))
-        rows = self.cursor.fetchall()
-        if rows:
-            row = rows[0]
+        row = cursor.execute(command, (id_,)).fetchone()
+        if row is not None:
             cpassword = row[2]
             if upassword==cpassword:
                 return 'Login Success'
@@ -94,74 +113,78 @@ class MySqlite3Manager:
                 return 'Wrong password Try again'
         else:
             return 'Id not found'
-   
+
     def get_id_from_name(self, name):
-        self.connect()
-        command = "SELECT * FROM PERSON WHERE (Name) = ? "
-        self.cursor.execute(command, (name,))
-        rows = self.cursor.fetchall()
-        if rows:
-            row = rows[0]
+        con = self.connect()
+        cursor = con.cursor()
+        row = cursor.execute(_Q_ID_FROM_NAME, (name,)).fetchone()
+        if row is not None:
             id_ = row[0]
             return id_
         return None
-    
+
     def get_name_from_id(self, id_):
-        self.connect()
-        command = "SELECT * FROM PERSON WHERE (Id) = ? "
-        self.cursor.execute(command, (id_,))
-        rows = self.cursor.fetchall()
-        if rows:
-            row = rows[0]
-            name = row[1]
+        con = self.connect()
+        cursor = con.cursor()
+        row = cursor.execute(_Q_NAME_FROM_ID, (id_,)).fetchone()
+        if row is not None:
+            name = row[0]
             return name
         return None
-    
+
     def get_person_name(self, id_):
-        self.connect()
-        command = "SELECT * FROM PERSON WHERE (Id) = ? "
-        self.cursor.execute(command, (id_,))
-        rows = self.cursor.fetchall()
-        if rows:
-            row = rows[0]
-            name = row[1]
+        con = self.connect()
+        cursor = con.cursor()
+        row = cursor.execute(_Q_NAME_FROM_ID, (id_,)).fetchone()
+        if row is not None:
+            name = row[0]
             return name
         return None
-    
+
     def get_person_title(self, id_):
-        self.connect()
-        command = "SELECT * FROM PERSON WHERE (Id) = ? "
-        self.cursor.execute(command, (id_,))
-        rows = self.cursor.fetchall()
-        if rows:
-            row = rows[0]
-            title = row[2]
+        con = self.connect()
+        cursor = con.cursor()
+        row = cursor.execute(_Q_TITLE_FROM_ID, (id_,)).fetchone()
+        if row is not None:
+            title = row[0]
             return title
         return None
-    
+
+    def get_person_name_title(self, id_):
+        con = self.connect()
+        cursor = con.cursor()
+        row = cursor.execute(_Q_NAME_TITLE_FROM_ID, (id_,)).fetchone()
+        if row is not None:
+            return row[0], row[1]
+        return None, None
+
     def get_person_list(self):
-        self.connect()
-        command = "SELECT * FROM PERSON "
-        self.cursor.execute(command)
-        rows = self.cursor.fetchall()
+        con = self.connect()
+        cursor = con.cursor()
+        cursor.execute(_Q_PERSON_IDS)
+        rows = cursor.fetchall()
         person_list=[]
         if rows:
             person_list=[row[0] for row in rows]
         return person_list
+    def get_all_person_info(self):
+        con = self.connect()
+        cursor = con.cursor()
+        cursor.execute(_Q_PERSON_INFO)
+        return cursor.fetchall()
     def get_admin_name(self, id_):
-        self.connect()
+        con = self.connect()
+        cursor = con.cursor()
         command = "SELECT * FROM ADMIN WHERE (ID) = ? "
-        self.cursor.execute(command, (id_,))
-        rows = self.cursor.fetchall()
-        if rows:
-            row = rows[0]
+        row = cursor.execute(command, (id_,)).fetchone()
+        if row is not None:
             name = row[1]
             return name
         return None
-    
-    
 
-        
+
+
+
     def change_admin_id_password(self,oldadminid,oldadminpass,newadminid,newadminpass,newadminpassconf):
         status=self.authenticate_admin(oldadminid,oldadminpass)
         if status=='Login Success':
@@ -175,94 +198,90 @@ class MySqlite3Manager:
                 return 'confirm password not matched'
         else:
             return 'previous admin id or password not matched'
-    
+
 
     def get_all_person_ids(self,):
-        self.connect()
-        df = pd.read_sql_query(f"SELECT * FROM PERSON", self.con)
-        self.con.close()
+        con = self.connect()
+        df = pd.read_sql_query(_Q_PERSON_IDS, con)
         return list(df['Id'].values)
     def get_attendance_data(self,):
-        self.connect()
-        df = pd.read_sql_query(f"SELECT * FROM ATTENDANCE", self.con)
+        con = self.connect()
+        df = pd.read_sql_query(f"SELECT * FROM ATTENDANCE", con)
         return df
-        
+
     def total_person(self)->str:
-        self.connect()
-        df = pd.read_sql_query(f"SELECT * FROM PERSON", self.con)
-        self.con.close()
-        return str(len(df))
+        con = self.connect()
+        cursor = con.cursor()
+        cursor.execute("SELECT COUNT(*) FROM PERSON")
+        count = cursor.fetchone()[0]
+        return str(count)
     def total_data_attendance(self)->str:
-        self.connect()
-        df = pd.read_sql_query(f"SELECT * FROM ATTENDANCE", self.con)
-        self.con.close()
-        return str(len(df))
-    
+        con = self.connect()
+        cursor = con.cursor()
+        cursor.execute("SELECT COUNT(*) FROM ATTENDANCE")
+        count = cursor.fetchone()[0]
+        return str(count)
+
     def delete_data_from_person(self, id_):
         face_deleted=False
         name=self.get_person_name(id_)
-        self.connect()
+        con = self.connect()
+        cursor = con.cursor()
         command = "DELETE FROM PERSON WHERE Id=? "
         try:
-            self.cursor.execute(command, (id_,))
-            self.con.commit()
-            self.con.close()
+            cursor.execute(command, (id_,))
+            con.commit()
             try:
                 os.remove(f'images/{id_}.png')
                 face_deleted=True
             except Exception as e:
                 print(e)
-    
+
             if face_deleted==True:
                 return True
             else:
                 return False
         except:
-            return False 
+            return False
     def delete_data_from_admin(self, id_):
-        self.connect()
+        con = self.connect()
+        cursor = con.cursor()
         command = "DELETE FROM ADMIN WHERE ID=? "
         try:
-            self.cursor.execute(command, (id_,))
-            self.con.commit()
-            self.con.close()
+            cursor.execute(command, (id_,))
+            con.commit()
             return True
         except:
-            return False 
+            return False
     def delete_datbase(self):
-        self.connect()
+        con = self.connect()
+        cursor = con.cursor()
         command = "DROP DATABASE "+self.dbname
-        self.cursor.execute(command)
-        self.con.commit()
+        cursor.execute(command)
+        con.commit()
         print ('Success! DATABASE Deleted')
     def get_last_entry_time(self, personid):
-        self.con=sqlite3.connect(self.dbname)
-        cursor = self.con.cursor()
-        command = "SELECT * FROM ATTENDANCE WHERE (Id) = ? and (Date) = ? and (Status) = ?"
+        con = self.connect()
+        cursor = con.cursor()
         cdate,ctime,cdtime=get_current_datetime()
-        cursor.execute(command, (str(personid),cdate,'Present'))
-        rows = cursor.fetchall()
-        if rows:
-            row = rows[-1]
+        row = cursor.execute(_Q_LAST_ENTRY, (str(personid),cdate,'Present')).fetchone()
+        if row is not None:
             time = str(row[5])
             return time
         return None
     def get_filtered_report(self,sid,smonth,syear):
-        self.connect()
+        con = self.connect()
         if sid=="":
-            df = pd.read_sql_query(f"SELECT * FROM ATTENDANCE ", self.con)
-            self.con.close()
+            df = pd.read_sql_query(f"SELECT * FROM ATTENDANCE ", con)
             return df
         else:
-            df = pd.read_sql_query(f"SELECT * FROM ATTENDANCE WHERE Id = '{sid}'", self.con)
-            self.con.close()
-            #filter by year
-            df = df[df['Date'].str[-4:] == syear]
-            #filter by month
-            df = df[df['Date'].str[-7:-5] == month2number[smonth]]
+            # Date is stored as DD-MM-YYYY; match month and year with a single pattern in SQL
+            command = "SELECT * FROM ATTENDANCE WHERE Id = ? AND Date LIKE ?"
+            df = pd.read_sql_query(command, con, params=(sid, f"__-{month2number[smonth]}-{syear}"))
             return df
 
-    
+
+
 
 
 
@@ -1,50 +1,283 @@
 
 import cv2
+import numpy as np
 import os
 import time
+import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor
+# images taller than MAX_INPUT_HEIGHT are downscaled to TARGET_HEIGHT before detection
+MAX_INPUT_HEIGHT = 1000
+TARGET_HEIGHT = 500
+# tracked faces reuse their embedding and are re-identified every REIDENTIFY_EVERY frames
+REIDENTIFY_EVERY = 4
+# a face continues a track only if its box overlaps the track's last box by at least this IoU
+TRACK_MIN_IOU = 0.3
+# rows of the int8 gallery widened to float32 per matmul block when quantize is on
+QUANT_BLOCK_ROWS = 8192
+# the shared detector keeps one YuNet per input size for this many frame sizes
+MAX_DETECTOR_SIZES = 4
+def get_dnn_backend_target():
+    """Use OpenCV's CUDA backend (FP16) when a CUDA device is available, otherwise the CPU"""
+    try:
+        if cv2.cuda.getCudaEnabledDeviceCount() > 0:
+            return cv2.dnn.DNN_BACKEND_CUDA, cv2.dnn.DNN_TARGET_CUDA_FP16
+    except Exception as e:
+        print(e)
+    return cv2.dnn.DNN_BACKEND_OPENCV, cv2.dnn.DNN_TARGET_CPU
+class _ModelSet:
+    # one detector/recognizer pair with its batch feature net; a set serves one call at a time
+    def __init__(self, face_detector, face_recognizer, feature_net):
+        self.face_detector = face_detector
+        self.face_recognizer = face_recognizer
+        self.feature_net = feature_net
+        self.size_detectors = {}
 class FaceRecognizer:
-    def __init__(self,thresold=0.5,draw=True):
+    def __init__(self,thresold=0.5,draw=True,quantize=False,reidentify_every=REIDENTIFY_EVERY,model_workers=1):
         self.thresold=thresold
         self.draw=draw
+        # keep the gallery as int8 instead of float32 (4x smaller, for very large galleries)
+        self.quantize=quantize
         self.unknownmatch=0
+        self._tracks = {}
+        # a tracked face's embedding is reused for this many frames before it is extracted again
+        self.reidentify_every = reidentify_every
+        # the models keep per-call state (input size), so each call borrows a whole model set from a
+        # small pool; up to model_workers frames run in parallel without a full model copy per thread
+        self._model_workers = max(1, model_workers)
+        self._model_sets = queue.Queue()
+        for _ in range(self._model_workers):
+            self._model_sets.put(_ModelSet(*self.create_models(), self.create_feature_net()))
+        # tracks are shared by every model set, so only their bookkeeping is serialized
+        self._lock = threading.Lock()
+        self.create_features()
+    def create_models(self):
+        backend_id, target_id = get_dnn_backend_target()
+        try:
+            return self._create_models(backend_id, target_id)
+        except cv2.error as e:
+            print(f"Warning: Could not create models on the CUDA target, falling back to CPU: {e}")
+            return self._create_models(cv2.dnn.DNN_BACKEND_OPENCV, cv2.dnn.DNN_TARGET_CPU)
+    def create_feature_net(self):
+        # FaceRecognizerSF.feature takes one face at a time; the raw SFace net accepts a batch
+        backend_id, target_id = get_dnn_backend_target()
+        feature_net = cv2.dnn.readNetFromONNX("model/face_recognizer_fast.onnx")
+        feature_net.setPreferableBackend(backend_id)
+        feature_net.setPreferableTarget(target_id)
+        return feature_net
+    def create_detector(self):
+        backend_id, target_id = get_dnn_backend_target()
+        weights ="model/face_detection_yunet_2023mar.onnx"
+        try:
+            return cv2.FaceDetectorYN_create(weights, "", (0, 0), 0.87, 0.3, 5000, backend_id, target_id)
+        except cv2.error as e:
+            print(f"Warning: Could not create detector on the CUDA target, falling back to CPU: {e}")
+            return cv2.FaceDetectorYN_create(weights, "", (0, 0), 0.87, 0.3, 5000,
+                                             cv2.dnn.DNN_BACKEND_OPENCV, cv2.dnn.DNN_TARGET_CPU)
+    def prepare_input_size(self, size):
+        """Set up every pooled detector for a frame size ahead of the first frame"""
+        borrowed = [self._model_sets.get() for _ in range(self._model_workers)]
+        try:
+            for models in borrowed:
+                self._detector_for_size(models, tuple(size))
+        finally:
+            for models in borrowed:
+                self._model_sets.put(models)
+    def _detector_for_size(self, models, size):
+        # YuNet regenerates its priors on every setInputSize, so sources with different frame
+        # sizes (browser webcam, RTSP, background webcam) each keep a detector set up for theirs
+        face_detector = models.size_detectors.get(size)
+        if face_detector is None:
+            if not models.size_detectors:
+                face_detector = models.face_detector
+            else:
+                if len(models.size_detectors) >= MAX_DETECTOR_SIZES:
+                    face_detector = models.size_detectors.pop(next(iter(models.size_detectors)))
+                else:
+                    face_detector = self.create_detector()
+            face_detector.setInputSize(size)
+            models.size_detectors[size] = face_detector
+        return face_detector
+    def _create_models(self, backend_id, target_id):
         weights ="model/face_detection_yunet_2023mar.onnx"
-        self.face_detector = cv2.FaceDetectorYN_create(weights, "", (0, 0))
-        self.face_detector.setScoreThreshold(0.87)
+        face_detector = cv2.FaceDetectorYN_create(weights, "", (0, 0), 0.87, 0.3, 5000, backend_id, target_id)
         weights = "model/face_recognizer_fast.onnx"
-        self.face_recognizer = cv2.FaceRecognizerSF_create(weights, "")
-        self.create_features()
+        face_recognizer = cv2.FaceRecognizerSF_create(weights, "", backend_id, target_id)
+        return face_detector, face_recognizer
     def create_features(self):
-        self.dictionary = {}
+        self._mtimes = {}
+        # writers build a new gallery and swap it in whole; the lock also serializes the cache file
+        self._gallery_lock = threading.Lock()
+        self._gallery = self._build_gallery([], [])
         # Get the directory where this script is located
         script_dir = os.path.dirname(os.path.abspath(__file__))
         images_dir = os.path.join(script_dir, "images")
+        cache_path = os.path.join(script_dir, "system", "gallery.npz")
+        self._images_dir = images_dir
+        self._cache_path = cache_path
 
         # Check if images directory exists
         if not os.path.exists(images_dir):
             print(f"Warning: Images directory not found at {images_dir}")
             return
 
-        files=os.listdir(images_dir)
-        files = list(set(files))
-        for file in files:
-            # Skip hidden files and non-image files
-            if file.startswith('.') or file.lower().endswith(('.txt', '.pickle', '.pkl')):
-                continue
-
-            image_path = os.path.join(images_dir, file)
-            image = cv2.imread(image_path)
-
-            # Skip if image couldn't be loaded
-            if image is None:
-                print(f"Warning: Could not load image {file}")
-                continue
-
-            feats, faces = self.recognize_face(image, file)
-            if faces is None:
-                continue
-            user_id = os.path.splitext(os.path.basename(file))[0]
-            self.dictionary[user_id] = feats[0]
-    def recognize_face(self,image,file_name=None):
+        # Skip hidden files, directories (e.g. backgrounds/) and non-image files
+        with os.scandir(images_dir) as it:
+            entries = [e for e in it if e.is_file() and not e.name.startswith('.')
+                       and e.name.lower().endswith(('.png', '.jpg', '.jpeg'))]
+
+        # Reuse embeddings cached from a previous run for images whose mtime is unchanged
+        cache = self._load_feature_cache(cache_path)
+        ids, rows = [], []
+        pending = []
+        for entry in entries:
+            user_id = os.path.splitext(entry.name)[0]
+            mtime = entry.stat().st_mtime
+            cached = cache.get(user_id)
+            if cached is not None and cached[0] == mtime:
+                ids.append(user_id)
+                rows.append(cached[1])
+            else:
+                pending.append(entry.name)
+            self._mtimes[user_id] = mtime
+        files = pending
+
+        # OpenCV DNN inference releases the GIL, so enrollment scales across threads.
+        # The detector keeps per-call input size state, so each worker gets its own models.
+        worker_models = threading.local()
+        def enroll_one(file):
+            if not hasattr(worker_models, 'models'):
+                worker_models.models = self.create_models()
+            return self._enroll_one(images_dir, file, *worker_models.models)
+
+        if files:
+            with ThreadPoolExecutor(max_workers=min(os.cpu_count() or 1, len(files))) as ex:
+                results = list(ex.map(enroll_one, files))
+            for result in results:
+                if result is not None:
+                    user_id, feat = result
+                    ids.append(user_id)
+                    rows.append(feat)
+        self._gallery = self._build_gallery(ids, rows)
+        if files or len(cache) != len(ids):
+            self._save_feature_cache(cache_path)
+    @property
+    def dictionary(self):
+        """Enrolled features as {user_id: unit-norm feature}, built on demand from the gallery matrix"""
+        ids, features = self._gallery[:2]
+        return {user_id: features[i:i+1] for i, user_id in enumerate(ids)}
+    def _load_feature_cache(self, cache_path):
+        if not os.path.exists(cache_path):
+            return {}
+        try:
+            with np.load(cache_path, allow_pickle=False) as data:
+                return {user_id: (mtime, self._unit(feat))
+                        for user_id, mtime, feat in zip(data['ids'].tolist(), data['mtimes'], data['features'])}
+        except Exception as e:
+            print(f"Warning: Could not load feature cache {cache_path}: {e}")
+            return {}
+    def _save_feature_cache(self, cache_path):
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            tmp_path = cache_path + ".tmp.npz"
+            ids, features = self._gallery[:2]
+            np.savez(tmp_path, ids=np.array(ids, dtype=str),
+                     mtimes=np.array([self._mtimes.get(u, 0.0) for u in ids], dtype=np.float64),
+                     features=features)
+            os.replace(tmp_path, cache_path)
+        except Exception as e:
+            print(f"Warning: Could not save feature cache {cache_path}: {e}")
+    def _enroll_one(self, images_dir, file, face_detector, face_recognizer):
+        image_path = os.path.join(images_dir, file)
+        image = cv2.imread(image_path)
+
+        # Skip if image couldn't be loaded
+        if image is None:
+            print(f"Warning: Could not load image {file}")
+            return None
+
+        feats, faces = self.recognize_face(image, file, face_detector, face_recognizer)
+        if faces is None:
+            return None
+        user_id = os.path.splitext(os.path.basename(file))[0]
+        return user_id, self._unit(feats[0])
+    def add_user(self, user_id, image):
+        """Enroll a single user into the existing gallery; returns False if no face was found"""
+        feats, faces = self.recognize_face(image, f"{user_id}.png")
+        if faces is None:
+            return False
+        self.add_feature(user_id, feats[0])
+        return True
+    def add_feature(self, user_id, feature):
+        """Enroll a user from an already extracted feature, without running detection again"""
+        image_path = os.path.join(self._images_dir, f"{user_id}.png")
+        row = self._unit(feature).reshape(1, -1)
+        with self._gallery_lock:
+            ids, features, gallery_q, gallery_scales = self._gallery
+            # re-enrolling replaces the user's previous row
+            keep = np.array([u != user_id for u in ids], dtype=bool)
+            kept = int(keep.sum())
+            if os.path.exists(image_path):
+                self._mtimes[user_id] = os.path.getmtime(image_path)
+            features = np.vstack([features[keep], row]) if kept else np.ascontiguousarray(row)
+            if self.quantize:
+                row_q, row_scale = self._quantize(row)
+                gallery_q = np.vstack([gallery_q[keep], row_q]) if kept else row_q
+                gallery_scales = np.concatenate([gallery_scales[keep], row_scale]) if kept else row_scale
+            self._gallery = ([u for u in ids if u != user_id] + [user_id], features, gallery_q, gallery_scales)
+            self._save_feature_cache(self._cache_path)
+    def remove_user(self, user_id):
+        """Drop a single user's row from the gallery"""
+        self.remove_users([user_id])
+    def remove_users(self, user_ids):
+        """Drop several users' rows from the gallery with one masked copy and one cache write"""
+        removed = set(user_ids)
+        with self._gallery_lock:
+            ids, features, gallery_q, gallery_scales = self._gallery
+            keep = np.array([user_id not in removed for user_id in ids], dtype=bool)
+            if keep.all():
+                return
+            for user_id in removed:
+                self._mtimes.pop(user_id, None)
+            if self.quantize:
+                gallery_q, gallery_scales = gallery_q[keep], gallery_scales[keep]
+            self._gallery = ([user_id for user_id in ids if user_id not in removed], features[keep], gallery_q, gallery_scales)
+            self._save_feature_cache(self._cache_path)
+    @staticmethod
+    def _unit(feature):
+        # enrolled features are stored unit-norm so cosine similarity is a plain dot product
+        feature = feature.reshape(-1)
+        return (feature / np.linalg.norm(feature)).astype(np.float32)
+    def _build_gallery(self, ids, rows):
+        # enrolled features live in one contiguous (N, D) matrix with a parallel id list, so matching
+        # is a single matmul; returns (ids, features, int8 rows, row scales), the last two only when quantizing.
+        # Readers take the tuple once, so a concurrent add or remove never pairs rows with the wrong ids
+        ids = list(ids)
+        if not ids:
+            return ids, np.empty((0, 0), dtype=np.float32), np.empty((0, 0), dtype=np.int8), np.empty(0, dtype=np.float32)
+        features = np.ascontiguousarray(np.vstack(rows), dtype=np.float32)
+        gallery_q, gallery_scales = self._quantize(features) if self.quantize else (None, None)
+        return ids, features, gallery_q, gallery_scales
+    @staticmethod
+    def _quantize(rows):
+        # symmetric int8 with one scale per row: each row's largest component maps to +-127,
+        # so the full int8 range is used instead of the ~1/3 a fixed 1/127 scale leaves for 128-d unit vectors
+        scales = np.abs(rows).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        q = np.round(rows / scales[:, None]).astype(np.int8)
+        return q, scales.astype(np.float32)
+    def recognize_face(self,image,file_name=None,face_detector=None,face_recognizer=None,track=None):
+        # track: key of a video stream whose faces may reuse recent embeddings, None to always extract
+        models = None
+        if face_detector is None or face_recognizer is None:
+            # borrow a pooled model set; callers beyond the pool size wait here for one to come back
+            models = self._model_sets.get()
+        try:
+            return self._recognize_face(image, file_name, face_detector, face_recognizer, track, models)
+        finally:
+            if models is not None:
+                self._model_sets.put(models)
+    def _recognize_face(self,image,file_name,face_detector,face_recognizer,track,models):
         # Check if image is None or empty
         if image is None:
             print(f"Error: Image is None for file {file_name}")
@@ -56,45 +289,125 @@ class FaceRecognizer:
         if channels == 4:
             image = cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
 
-        if image.shape[0] > 1000:
-            image = cv2.resize(image, (0, 0),
-                            fx=500 / image.shape[0], fy=500 / image.shape[0])
-        
+        if image.shape[0] > MAX_INPUT_HEIGHT:
+            h, w = image.shape[:2]
+            image = cv2.resize(image, (int(w * TARGET_HEIGHT / h), TARGET_HEIGHT),
+                            interpolation=cv2.INTER_AREA)
+
         height, width, _ = image.shape
-        self.face_detector.setInputSize((width, height))
+        if face_detector is None:
+            face_detector = self._detector_for_size(models, (width, height))
+        # YuNet regenerates its priors on every setInputSize, so only call it when the size changes
+        elif tuple(face_detector.getInputSize()) != (width, height):
+            face_detector.setInputSize((width, height))
+        feature_net = None
+        if face_recognizer is None:
+            face_recognizer, feature_net = models.face_recognizer, models.feature_net
         try:
             dts = time.time()
-            _, faces = self.face_detector.detect(image)
+            _, faces = face_detector.detect(image)
             if file_name is not None:
                 assert len(faces) > 0, f'the file {file_name} has no face'
 
             faces = faces if faces is not None else []
-            features = []
+            features = [None] * len(faces)
+            matched = []
             #print(f'time detection  = {time.time() - dts}')
-            for face in faces:
-                rts = time.time()
-                aligned_face = self.face_recognizer.alignCrop(image, face)
-                feat = self.face_recognizer.feature(aligned_face)
-                #print(f'time recognition  = {time.time() - rts}')
-                features.append(feat)
+            if track is not None:
+                with self._lock:
+                    matched = self._match_tracks(self._age_tracks(track), faces)
+                for idx, entry in matched:
+                    features[idx] = entry[1]
+            pending = [(idx, face_recognizer.alignCrop(image, face))
+                       for idx, face in enumerate(faces) if features[idx] is None]
+            rts = time.time()
+            feats = self._extract_features([aligned_face for _, aligned_face in pending], face_recognizer, feature_net)
+            #print(f'time recognition  = {time.time() - rts}')
+            for (idx, _), feat in zip(pending, feats):
+                features[idx] = feat
+            if track is not None:
+                # tracks not seen in this frame are dropped, so a newcomer can't inherit the
+                # embedding of someone who just left; matched ones follow their face's box
+                tracks = [[faces[idx][:4].copy(), entry[1], entry[2]] for idx, entry in matched]
+                tracks += [[faces[idx][:4].copy(), features[idx], self.reidentify_every] for idx, _ in pending]
+                with self._lock:
+                    self._tracks[track] = tracks
             return features, faces
         except Exception as e:
             print(e)
             print(file_name)
             return None, None
+    def _extract_features(self, aligned_faces, face_recognizer, feature_net=None):
+        if len(aligned_faces) > 1 and feature_net is not None:
+            # one forward pass for every face in the frame, same preprocessing as FaceRecognizerSF
+            blob = cv2.dnn.blobFromImages(aligned_faces, 1.0, (112, 112), (0, 0, 0), True, False)
+            feature_net.setInput(blob)
+            out = feature_net.forward()
+            return [out[i:i + 1] for i in range(len(aligned_faces))]
+        return [face_recognizer.feature(aligned_face) for aligned_face in aligned_faces]
+    def forget_track(self, track):
+        """Drop the cached embeddings of a video stream that has ended"""
+        with self._lock:
+            self._tracks.pop(track, None)
+    def _age_tracks(self, track):
+        # each track is [box, feature, frames left]; the countdown is the re-identification period,
+        # a track is not refreshed by matching, so its face is extracted again when it runs out
+        tracks = [[box, feature, ttl - 1] for box, feature, ttl in self._tracks.get(track, [])]
+        return [entry for entry in tracks if entry[2] > 0]
+    @staticmethod
+    def _match_tracks(tracks, faces):
+        """(face index, track) pairs where the face and the track overlap each other and nothing else"""
+        if not tracks or len(faces) == 0:
+            return []
+        face_boxes = np.asarray(faces, dtype=np.float32)[:, :4]
+        track_boxes = np.array([entry[0] for entry in tracks], dtype=np.float32)
+        # IoU of every face box against every track box, boxes as (x, y, w, h)
+        x1 = np.maximum(face_boxes[:, None, 0], track_boxes[None, :, 0])
+        y1 = np.maximum(face_boxes[:, None, 1], track_boxes[None, :, 1])
+        x2 = np.minimum(face_boxes[:, None, 0] + face_boxes[:, None, 2], track_boxes[None, :, 0] + track_boxes[None, :, 2])
+        y2 = np.minimum(face_boxes[:, None, 1] + face_boxes[:, None, 3], track_boxes[None, :, 1] + track_boxes[None, :, 3])
+        inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+        areas = face_boxes[:, 2:4].prod(axis=1)[:, None] + track_boxes[:, 2:4].prod(axis=1)[None, :]
+        overlaps = inter / np.maximum(areas - inter, 1e-6) >= TRACK_MIN_IOU
+        # a face competing with another face for a track, or overlapping several tracks, is
+        # extracted again rather than given an embedding that may belong to someone else
+        return [(idx, tracks[int(overlaps[idx].argmax())]) for idx in range(len(face_boxes))
+                if overlaps[idx].sum() == 1 and overlaps[:, overlaps[idx].argmax()].sum() == 1]
     def match(self, feature1):
-        max_score = 0.0
-        sim_user_id = ""
-        for user_id, feature2 in zip(self.dictionary.keys(), self.dictionary.values()):
-            score = self.face_recognizer.match(feature1, feature2, cv2.FaceRecognizerSF_FR_COSINE)
-            if score >= max_score:
-                max_score = score
-                sim_user_id = user_id
-        if max_score < self.thresold:
+        best = self.match_batch([feature1])[0]
+        if best is None:
             return False, ("", 0.0)
-        return True, (sim_user_id, max_score)
+        return True, best
+    def match_batch(self, features):
+        """Score every face against the whole gallery in one matmul; returns (id, score) or None per face"""
+        if features is None or len(features) == 0:
+            return []
+        ids, gallery, gallery_q, gallery_scales = self._gallery
+        if not ids:
+            return [None] * len(features)
+        q = np.ascontiguousarray(np.vstack(features).reshape(len(features), -1), dtype=np.float32)
+        q /= np.linalg.norm(q, axis=1, keepdims=True)
+        if self.quantize:
+            q_q, q_scales = self._quantize(q)
+            scores = self._match_quantized(q_q, gallery_q)
+            scores *= q_scales[:, None]
+            scores *= gallery_scales
+        else:
+            scores = q @ gallery.T
+        best = scores.argmax(axis=1)
+        best_scores = scores[np.arange(len(best)), best].tolist()
+        return [(ids[idx], score) if score >= self.thresold else None
+                for idx, score in zip(best.tolist(), best_scores)]
+    def _match_quantized(self, q_q, gallery_q):
+        # int8 products summed over D=128 stay far below 2**24, so float32 BLAS gives the exact
+        # integer dot products; widening the gallery one block at a time keeps the temporary in cache
+        q_q = q_q.astype(np.float32)
+        scores = np.empty((len(q_q), len(gallery_q)), dtype=np.float32)
+        for start in range(0, len(gallery_q), QUANT_BLOCK_ROWS):
+            block = gallery_q[start:start + QUANT_BLOCK_ROWS].astype(np.float32)
+            np.matmul(q_q, block.T, out=scores[:, start:start + QUANT_BLOCK_ROWS])
+        return scores
     def detect(self,image):
-        rawimg=image.copy()
         fetures, faces = self.recognize_face(image)
         id_name="Unknown"
         id_name_list=[]
@@ -124,7 +437,7 @@ class FaceRecognizer:
         cv2.rectangle(image, (x1,y1-35),(x2,y1), (0,0,0), -1, cv2.LINE_AA)
         cv2.putText(image, "Keep Face Inside Box", (x1,y1-10), cv2.FONT_HERSHEY_COMPLEX_SMALL, 1.5, (255,255,255), 1, cv2.LINE_AA)
         cv2.rectangle(image, (x1,y1),(x2,y2), (0,255,255), linethickness, cv2.LINE_AA)
-        fetures, faces = self.recognize_face(image)        
+        fetures, faces = self.recognize_face(image)
         if faces is not None:
             for idx, (face, feature) in enumerate(zip(faces, fetures)):
                 result, user = self.match(feature)
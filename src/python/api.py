@@ -1,22 +1,23 @@
 from fastapi import FastAPI, HTTPException, File, UploadFile, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import FileResponse, StreamingResponse, ORJSONResponse, Response
 from pydantic import BaseModel
 import uvicorn
 import base64
 import cv2
 import numpy as np
-from PIL import Image
-from io import BytesIO
 import os
 from typing import Optional, Dict
-import pickle
+import orjson
+import hashlib
 import time
 import logging
 import asyncio
+import threading
 from contextlib import asynccontextmanager
-import queue
+from functools import lru_cache
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 
 # SocketIO imports
 import socketio
@@ -52,12 +53,24 @@ async def lifespan(app: FastAPI):
     # Shutdown - Cleanup SocketIO connections
     print("🔌 Cleaning up SocketIO connections...")
     detection_active.clear()
+    inference_executor.shutdown(wait=False, cancel_futures=True)
     print("✅ Cleanup complete")
 
+class OrjsonSocketIO:
+    """json module stand-in so SocketIO packets are encoded with orjson (numpy scalars included)"""
+    @staticmethod
+    def dumps(obj, **kwargs):
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS).decode()
+
+    @staticmethod
+    def loads(data, **kwargs):
+        return orjson.loads(data)
+
 # Create SocketIO server - Allow all origins
 sio = socketio.AsyncServer(
     async_mode='asgi',
-    cors_allowed_origins="*"  # Allow any origin including device IPs
+    cors_allowed_origins="*",  # Allow any origin including device IPs
+    json=OrjsonSocketIO
 )
 
 app = FastAPI(
@@ -65,6 +78,7 @@ app = FastAPI(
     description="Face recognition system for person attendance",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
     docs_url="/api/docs",
     redoc_url=None,
     openapi_url="/api/openapi.json"
@@ -88,20 +102,69 @@ db = MySqlite3Manager()
 recognition_config = config_manager.get_recognition_config()
 face_recognizer = FaceRecognizer(
     thresold=recognition_config.get('threshold', 0.45),
-    draw=recognition_config.get('draw_boxes', True)
+    draw=recognition_config.get('draw_boxes', True),
+    quantize=recognition_config.get('quantize_gallery', False),
+    reidentify_every=recognition_config.get('recog_every_n', 4),
+    model_workers=recognition_config.get('model_workers', 2)
 )
+# Set the detector up now for the downscaled camera frame size (640x360 for 16:9 sources)
+face_recognizer.prepare_input_size(recognition_config.get('detector_input_size', (640, 360)))
 
 # SocketIO globals
 detection_active: Dict[str, bool] = {}
 welcome_screens: Dict[str, bool] = {}  # Track welcome screen connections
+WELCOME_ROOM = 'welcome_screens'  # SocketIO room every registered welcome screen joins
+DETECTION_ROOM = 'detection_clients'  # SocketIO room of the clients in detection_active
+background_image_cache: Dict = {'path': None, 'mtime': None, 'contents': None}  # Welcome-screen background bytes
+last_broadcast_ts: Dict[str, float] = {}  # person_id -> time of last browser-frame recognition broadcast
+BROADCAST_INTERVAL = 2.0  # Seconds between welcome-screen broadcasts for the same person
 latest_recognition: Dict = {}  # Store latest recognition result
+latest_recognition_body = orjson.dumps({'success': True, 'user': None, 'timestamp': None})  # Pre-encoded polling response
+latest_recognition_etag = f'"{hashlib.md5(latest_recognition_body).hexdigest()}"'
 rtsp_streams: Dict[str, bool] = {}  # Track active RTSP streams
 ffmpeg_streams: Dict[str, bool] = {}  # Track active ffmpeg streams with overlays
+rtsp_broadcasters: Dict[str, 'RtspBroadcaster'] = {}  # rtsp_url -> pipeline shared by every overlay viewer
 webcam_streams: Dict[str, bool] = {}  # Track active webcam streams
+frames_in_flight = set()  # Clients whose previous frame is still being processed
+last_frame_ts: Dict[str, float] = {}  # sid -> time the last accepted browser frame arrived
+MIN_FRAME_INTERVAL = 1 / 15  # Browser frames arriving faster than 15 FPS are dropped before decoding
+# Browser, RTSP and webcam frames are downscaled to this longest side before detection
+MAX_FRAME_SIDE = recognition_config.get('detection_max_side', 640)
+resize_buffers = threading.local()  # Per inference thread: reusable destination for that downscale
+# RTSP overlay streams detect on every n-th frame and redraw the last boxes on the ones in between
+DETECT_EVERY_N = max(1, recognition_config.get('detect_every_n', 3))
+JPEG_ENCODE_PARAMS = [cv2.IMWRITE_JPEG_QUALITY, 85]  # MJPEG stream frames
+PNG_FAST_PARAMS = [cv2.IMWRITE_PNG_COMPRESSION, 1]  # Stored registration images
+# RTSP over TCP without demuxer buffering; OpenCV reads this when a capture is opened
+os.environ.setdefault('OPENCV_FFMPEG_CAPTURE_OPTIONS', 'rtsp_transport;tcp|max_delay;0')
+# Let FFmpeg decode RTSP on the GPU (VAAPI, D3D11, ...) when one is available; falls back to software otherwise
+RTSP_CAPTURE_PARAMS = [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY]
+person_cache: Dict[str, tuple] = {}  # person_id -> (name, title), kept in sync with the PERSON table
+
+# Decode and inference run here so the event loop stays free for signaling and emits
+inference_executor = ThreadPoolExecutor(max_workers=os.cpu_count())
 
 # Independent detection system - load state from config on startup
 detection_session_id = None  # Track the current detection session
 
+def refresh_person_cache():
+    """Reload the person_id -> (name, title) cache with a single query"""
+    person_cache.clear()
+    for person_id, person_name, person_title in db.get_all_person_info():
+        person_cache[person_id] = (person_name, person_title)
+
+def get_person_info(person_id: str) -> tuple:
+    """Get (name, title) for a person from the cache, falling back to the database"""
+    info = person_cache.get(person_id)
+    if info is None:
+        # Only for ids missing from person_cache; one query fetches both columns
+        info = db.get_person_name_title(person_id)
+        if info[0] is not None:
+            person_cache[person_id] = info
+    return info
+
+refresh_person_cache()
+
 def get_independent_detection_active():
     """Get detection state from persistent config"""
     return config_manager.is_detection_active()
@@ -117,22 +180,46 @@ async def broadcast_recognition_to_welcome_screens(person_name: str, recognition
         return
 
     source_prefix = f"{source_type}: " if source_type else ""
-    print(f"🎯 {source_prefix}Broadcasting recognition to {len(welcome_screens)} welcome screens: {person_name}")
-
-    # Create tasks for broadcasting to avoid blocking the detection loop
-    tasks = []
-    for welcome_screen_sid in list(welcome_screens.keys()):
-        print(f"📺 {source_prefix}Sending recognition_result to welcome screen {welcome_screen_sid}")
-        task = asyncio.create_task(
-            sio.emit('recognition_result', recognition_data, to=welcome_screen_sid)
-        )
-        tasks.append(task)
+    logger.debug("%sBroadcasting recognition to %d welcome screens: %s", source_prefix, len(welcome_screens), person_name)
 
-    # Optional: Wait for all broadcasts to complete (but don't block on failures)
+    # One room emit encodes the payload once and fans it out to every welcome screen
     try:
-        await asyncio.gather(*tasks, return_exceptions=True)
+        await sio.emit('recognition_result', recognition_data, room=WELCOME_ROOM)
     except Exception as e:
-        print(f"⚠️ Some recognition broadcasts failed: {e}")
+        logger.warning("Some recognition broadcasts failed: %s", e)
+
+def decode_base64_bytes(image_data: str) -> bytes:
+    """Strip an optional data URL prefix and return the encoded image bytes"""
+    if image_data.startswith('data:image'):
+        # slice past the header in one step; split() would also build the header string and a list
+        image_data = image_data[image_data.index(',', 0, 64) + 1:]
+    return base64.b64decode(image_data, validate=False)
+
+def decode_image_bytes(image_bytes: bytes) -> np.ndarray:
+    """Decode encoded image bytes straight to a BGR array"""
+    image = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Could not decode image data")
+    return image
+
+def decode_base64_image(image_data: str) -> np.ndarray:
+    """Decode a base64 (optionally data URL) image straight to a BGR array"""
+    return decode_image_bytes(decode_base64_bytes(image_data))
+
+def face_to_result(face) -> dict:
+    """Bounding box as plain ints and detector score for one face row"""
+    x1, y1, w, h = face[:4].astype(np.int32).tolist()
+    return {
+        'bbox': [x1, y1, x1 + w, y1 + h],
+        'confidence': float(face[14]) if face.shape[0] > 14 else 0.0
+    }
+
+def set_latest_recognition(recognition_data: dict):
+    """Store the latest recognition and pre-encode the polling response and its ETag once"""
+    global latest_recognition_body, latest_recognition_etag
+    latest_recognition.update(recognition_data)
+    latest_recognition_body = orjson.dumps({'success': True, **latest_recognition}, option=orjson.OPT_SERIALIZE_NUMPY)
+    latest_recognition_etag = f'"{hashlib.md5(latest_recognition_body).hexdigest()}"'
 
 def create_recognition_data(best_match: dict, current_time: float) -> dict:
     """Create standardized recognition data structure"""
@@ -149,6 +236,13 @@ def create_recognition_data(best_match: dict, current_time: float) -> dict:
         'timestamp': current_time
     }
 
+def should_broadcast_person(person_id: str, current_time: float) -> bool:
+    """Coalesce repeat sightings of the same person into one welcome-screen broadcast per BROADCAST_INTERVAL"""
+    if current_time - last_broadcast_ts.get(person_id, 0.0) < BROADCAST_INTERVAL:
+        return False
+    last_broadcast_ts[person_id] = current_time
+    return True
+
 def should_broadcast_recognition(person_name: str, current_time: float, cooldown: float = 10.0) -> bool:
     """Check if enough time has passed to broadcast recognition (prevents spam)"""
     global last_detected_name, last_recognition_time
@@ -213,29 +307,34 @@ last_detected_name = ""
 last_recognition_time = 0.0
 recognition_cooldown = 3.0  # Seconds - prevents rapid flickering between different people
 
-# Configure logging
+# Configure logging - per-frame and per-event messages go through this logger at DEBUG/WARNING
 logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 # SocketIO event handlers for WebRTC signaling
 @sio.event
 async def connect(sid, environ):
-    print(f"🔌 Client connected: {sid}")
+    logger.info("Client connected: %s", sid)
 
 @sio.event
 async def disconnect(sid):
     global detection_session_id
 
-    print(f"🔌 Client disconnected: {sid}")
+    logger.info("Client disconnected: %s", sid)
     # Cleanup detection state for this client
     if sid in detection_active:
         del detection_active[sid]
+        await sio.leave_room(sid, DETECTION_ROOM)
+    last_frame_ts.pop(sid, None)
+    face_recognizer.forget_track(sid)
     # Cleanup welcome screen state
     if sid in welcome_screens:
         del welcome_screens[sid]
+        await sio.leave_room(sid, WELCOME_ROOM)
 
     # Detection state is controlled by persistent config and explicit admin actions only
     # Client disconnections should NOT automatically stop detection
-    print(f"🔄 Client disconnected - detection state remains unchanged (controlled by admin only)")
+    logger.debug("Client disconnected - detection state remains unchanged (controlled by admin only)")
 
 @sio.event
 async def start_detection(sid, data):
@@ -244,6 +343,7 @@ async def start_detection(sid, data):
 
     print(f"🔍 Starting face detection for client {sid}")
     detection_active[sid] = True
+    await sio.enter_room(sid, DETECTION_ROOM)
 
     # Start independent detection if not already active
     if not get_independent_detection_active():
@@ -271,6 +371,7 @@ async def start_video_stream(sid, data):
     """Start video streaming with overlays for a client"""
     print(f"🎥 Starting video stream for client {sid}")
     detection_active[sid] = True
+    await sio.enter_room(sid, DETECTION_ROOM)
     await sio.emit('stream_started', {'status': 'started'}, to=sid)
 
 @sio.event
@@ -284,6 +385,7 @@ async def stop_detection(sid, data):
     print(f"🛑 Stopping face detection for client {sid} (admin_stop: {is_admin_stop})")
     if sid in detection_active:
         del detection_active[sid]
+        await sio.leave_room(sid, DETECTION_ROOM)
 
     # Only stop independent detection if explicitly requested by admin
     # OR if no welcome screens AND no admin clients are connected AND not a page refresh
@@ -317,6 +419,7 @@ async def register_welcome_screen(sid, data):
     """Register a welcome screen popup"""
     print(f"📺 Welcome screen registered: {sid}")
     welcome_screens[sid] = True
+    await sio.enter_room(sid, WELCOME_ROOM)
 
     # Check if detection should be maintained/started for welcome screens
     detection_state = get_independent_detection_active()
@@ -358,6 +461,7 @@ async def unregister_welcome_screen(sid, data):
     print(f"📺 Welcome screen unregistered: {sid}")
     if sid in welcome_screens:
         del welcome_screens[sid]
+        await sio.leave_room(sid, WELCOME_ROOM)
 
     # Welcome screen disconnection should NOT auto-stop detection
     # Detection should only be stopped explicitly by admin users
@@ -374,26 +478,15 @@ async def request_background_image(sid, data):
         background_image_path = display_config.get('background_image')
         use_background_image = display_config.get('use_background_image', False)
 
-        if background_image_path and use_background_image and os.path.exists(background_image_path):
-            # Read file and convert to base64
-            with open(background_image_path, 'rb') as f:
-                contents = f.read()
-
-            # Determine MIME type from file extension
-            file_extension = background_image_path.split('.')[-1].lower()
-            mime_type_map = {
-                'png': 'image/png',
-                'jpg': 'image/jpeg',
-                'jpeg': 'image/jpeg',
-                'webp': 'image/webp'
-            }
-            mime_type = mime_type_map.get(file_extension, 'image/jpeg')
-
-            image_base64 = base64.b64encode(contents).decode('utf-8')
-            image_data_url = f"data:{mime_type};base64,{image_base64}"
+        contents = None
+        if background_image_path and use_background_image:
+            # Cached file bytes (None if the file is gone); they go out as a binary SocketIO attachment
+            contents = await asyncio.get_running_loop().run_in_executor(None, read_background_image, background_image_path)
 
+        if contents is not None:
             await sio.emit('background_image_data', {
-                'backgroundImage': image_data_url,
+                'backgroundImage': contents,
+                'mime': background_mime_type(background_image_path),
                 'useBackgroundImage': True
             }, to=sid)
             print(f"✅ Sent background image data to {sid}")
@@ -402,6 +495,94 @@ async def request_background_image(sid, data):
     except Exception as e:
         print(f"❌ Error sending background image to {sid}: {e}")
 
+def background_mime_type(path: str) -> str:
+    """MIME type of a background image, from its file extension"""
+    file_extension = path.split('.')[-1].lower()
+    mime_type_map = {
+        'png': 'image/png',
+        'jpg': 'image/jpeg',
+        'jpeg': 'image/jpeg',
+        'webp': 'image/webp',
+        'gif': 'image/gif'
+    }
+    return mime_type_map.get(file_extension, 'image/jpeg')
+
+def read_background_image(path: str) -> Optional[bytes]:
+    """Background image bytes, re-read from disk only when the path or file mtime changes; None if the file is gone (blocking on a miss)"""
+    # Uploads and deletes replace the cache entries from other threads, so compare against one copy
+    # and return bytes from that copy or from this read, never from the shared dict afterwards
+    cached = background_image_cache.copy()
+    try:
+        mtime = os.path.getmtime(path)
+        if cached['path'] == path and cached['mtime'] == mtime and cached['contents'] is not None:
+            return cached['contents']
+        with open(path, 'rb') as f:
+            contents = f.read()
+    except FileNotFoundError:
+        return None
+    background_image_cache.update(path=path, mtime=mtime, contents=contents)
+    return contents
+
+def save_face_image(image_path: str, image_bytes: bytes, image_cv: np.ndarray):
+    """Store a registration image as PNG (blocking, run it in an executor)"""
+    os.makedirs('images', exist_ok=True)
+    if image_bytes.startswith(b'\x89PNG'):
+        # Already PNG on the wire, store it as-is instead of re-encoding
+        with open(image_path, 'wb') as f:
+            f.write(image_bytes)
+    else:
+        # Fastest zlib level: the file is only shown in the admin list, size matters less than encode time
+        cv2.imwrite(image_path, image_cv, PNG_FAST_PARAMS)
+
+def run_frame_pipeline(frame_bytes, track=None):
+    """Decode a binary frame and run detection and matching on it (blocking, runs in inference_executor)"""
+    cv_frame = cv2.imdecode(np.frombuffer(frame_bytes, np.uint8), cv2.IMREAD_COLOR)
+    if cv_frame is None:
+        return None, None, None, []
+
+    frame_features, faces = detect_downscaled(cv_frame, track)
+    return cv_frame, frame_features, faces, face_recognizer.match_batch(frame_features)
+
+def run_image_pipeline(image_data: str):
+    """Decode a base64 image and run detection and matching on it (blocking, runs in inference_executor)"""
+    frame = decode_base64_image(image_data)
+    frame_features, faces = detect_downscaled(frame)
+    return frame_features, faces, face_recognizer.match_batch(frame_features)
+
+def run_upload_pipeline(image_data: str):
+    """Decode an uploaded base64 image and detect faces on it (blocking, runs in inference_executor)"""
+    image_bytes = decode_base64_bytes(image_data)
+    image_cv = decode_image_bytes(image_bytes)
+    features, faces = detect_downscaled(image_cv)
+    return image_bytes, image_cv, features, faces
+
+def run_camera_pipeline(frame, track=None):
+    """Run detection and matching on an RTSP/webcam frame (blocking, runs in inference_executor)"""
+    frame_features, faces = detect_downscaled(frame, track)
+    return frame_features, faces, face_recognizer.match_batch(frame_features)
+
+def detect_downscaled(frame, track=None):
+    """Detect on a copy downscaled to MAX_FRAME_SIDE, with boxes and landmarks mapped back to the original frame"""
+    # Detector cost grows with pixel count; the embedding comes from a 112x112 aligned crop either way.
+    # Faces of a tracked stream reuse their embedding for recog_every_n frames, boxes still update every frame
+    scale = MAX_FRAME_SIDE / max(frame.shape[:2])
+    if scale >= 1:
+        return face_recognizer.recognize_face(frame, track=track)
+    height, width = frame.shape[:2]
+    small_shape = (round(height * scale), round(width * scale)) + frame.shape[2:]
+    # Stream frames keep one size, so each thread resizes into the same buffer instead of allocating
+    # one per frame; nothing returned by recognize_face references it
+    small_frame = getattr(resize_buffers, 'frame', None)
+    if small_frame is None or small_frame.shape != small_shape:
+        small_frame = resize_buffers.frame = np.empty(small_shape, np.uint8)
+    cv2.resize(frame, (small_shape[1], small_shape[0]), dst=small_frame, interpolation=cv2.INTER_AREA)
+    frame_features, faces = face_recognizer.recognize_face(small_frame, track=track)
+    # No face comes back as an empty list rather than an array, and has nothing to rescale
+    if faces is not None and len(faces):
+        # The detector returns a fresh array per call, so it can be rescaled in place
+        faces[:, :14] /= scale
+    return frame_features, faces
+
 @sio.event
 async def process_frame_binary(sid, data):
     """
@@ -410,56 +591,50 @@ async def process_frame_binary(sid, data):
     """
    #print(f"📹 Binary frame processing for client {sid}")
 
+    # Drop the frame if this client's previous one is still being processed or it arrived too soon
+    if sid in frames_in_flight:
+        return
+    now = time.time()
+    if now - last_frame_ts.get(sid, 0.0) < MIN_FRAME_INTERVAL:
+        return
+    last_frame_ts[sid] = now
+    frames_in_flight.add(sid)
+
     try:
         # Check if detection is active for this client
         if not detection_active.get(sid, False):
             return
 
-        # Get binary frame data
-        frame_bytes = data['frame']
-
-        # Convert binary data to numpy array
-        nparr = np.frombuffer(frame_bytes, np.uint8)
-        cv_frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        # Decode and run face detection off the event loop
+        loop = asyncio.get_running_loop()
+        # Frames arrive as raw JPEG bytes; the older {'frame': bytes, ...} envelope is still accepted
+        frame_bytes = data if isinstance(data, (bytes, bytearray)) else data['frame']
+        cv_frame, frame_features, faces, matches = await loop.run_in_executor(
+            inference_executor, run_frame_pipeline, frame_bytes, sid)
 
         if cv_frame is None:
-            print(f"❌ Failed to decode frame for {sid}")
+            logger.warning("Failed to decode frame for %s", sid)
             return
 
-        # Run face detection
-        frame_features, faces = face_recognizer.recognize_face(cv_frame)
-
         # Process detection results
         detection_results = []
         if faces is not None and len(faces) > 0:
             for i, face in enumerate(faces):
-                # Get bounding box and convert to regular Python ints
-                x1, y1, w, h = face[:4].astype(int)
-                x2, y2 = x1 + w, y1 + h
-
-                result = {
-                    'bbox': [int(x1), int(y1), int(x2), int(y2)],
-                    'confidence': float(face[14]) if len(face) > 14 else 0.0
-                }
+                # Get bounding box as regular Python ints
+                result = face_to_result(face)
 
                 # Check for face recognition match
-                if i < len(frame_features) and face_recognizer.dictionary:
-                    feature = frame_features[i]
+                if i < len(frame_features):
                     best_match = None
-                    highest_score = 0
-
-                    for person_id, ref_feature in face_recognizer.dictionary.items():
-                        score = face_recognizer.face_recognizer.match(feature, ref_feature)
-                        if score > face_recognizer.thresold and score > highest_score:
-                            highest_score = score
-                            person_name = db.get_person_name(person_id)
-                            person_title = db.get_person_title(person_id)
-                            best_match = {
-                                'person_id': person_id,
-                                'person_name': person_name,
-                                'person_title': person_title,
-                                'confidence': float(score)
-                            }
+                    if matches[i] is not None:
+                        person_id, score = matches[i]
+                        person_name, person_title = get_person_info(person_id)
+                        best_match = {
+                            'person_id': person_id,
+                            'person_name': person_name,
+                            'person_title': person_title,
+                            'confidence': score
+                        }
 
                     if best_match:
                         result.update({
@@ -471,23 +646,12 @@ async def process_frame_binary(sid, data):
                         })
 
                         # Store latest recognition for polling endpoints
-                        recognition_data = {
-                            'type': 'recognition',
-                            'user': {
-                                'person_id': best_match['person_id'],
-                                'person_name': best_match['person_name'],
-                                'name': best_match['person_name'],
-                                'userTitle': best_match['person_title'],
-                                'confidence': best_match['confidence'],
-                                'photo': None
-                            },
-                            'timestamp': time.time()
-                        }
-                        latest_recognition.update(recognition_data)
+                        recognition_data = create_recognition_data(best_match, time.time())
+                        set_latest_recognition(recognition_data)
 
-                        # Broadcast recognition to all welcome screens
-                        for welcome_screen_sid in welcome_screens.keys():
-                            await sio.emit('recognition_result', recognition_data, to=welcome_screen_sid)
+                        # Broadcast recognition to all welcome screens, at most once per person per interval
+                        if should_broadcast_person(best_match['person_id'], recognition_data['timestamp']):
+                            await broadcast_recognition_to_welcome_screens(best_match['person_name'], recognition_data, "BROWSER")
 
                     else:
                         result.update({
@@ -499,10 +663,6 @@ async def process_frame_binary(sid, data):
 
                 detection_results.append(result)
 
-        # Draw overlays on frame for browser webcam
-        if detection_results:
-            cv_frame = draw_detection_overlays_on_frame(cv_frame, detection_results)
-
         # Send just the detection results, let frontend handle video display
         # No need to send processed frames back - frontend can overlay detection results
         await sio.emit('frame_processed_binary', {
@@ -516,14 +676,20 @@ async def process_frame_binary(sid, data):
             #print(f"🔍 Sent {len(detection_results)} detection results with binary frame to {sid}")
 
     except Exception as e:
-        print(f"❌ Error processing binary frame for {sid}: {e}")
+        logger.warning("Error processing binary frame for %s: %s", sid, e)
         await sio.emit('detection_error', {"error": str(e)}, to=sid)
+    finally:
+        frames_in_flight.discard(sid)
 
 
 
+OVERLAY_FONT = cv2.FONT_HERSHEY_SIMPLEX
+OVERLAY_FONT_SCALE = 0.7
+OVERLAY_THICKNESS = 2
+
 def draw_detection_overlays_on_frame(frame, faces):
-    """Draw detection overlays directly on video frame"""
-    overlay_frame = frame.copy()
+    """Draw detection overlays directly on video frame, in place (callers pass a frame they own)"""
+    overlay_frame = frame
 
     for face in faces:
         x1, y1, x2, y2 = face['bbox']
@@ -542,27 +708,116 @@ def draw_detection_overlays_on_frame(frame, faces):
             label_color = (255, 255, 255)
             bg_color = (0, 0, 255)
 
-        # Get text size
-        font = cv2.FONT_HERSHEY_SIMPLEX
-        font_scale = 0.7
-        thickness = 2
-        (text_width, text_height), _ = cv2.getTextSize(label, font, font_scale, thickness)
-
         # Draw text (without background rectangle)
-        cv2.putText(overlay_frame, label, (x1, y1 - 5), font, font_scale, label_color, thickness)
+        cv2.putText(overlay_frame, label, (x1, y1 - 5), OVERLAY_FONT, OVERLAY_FONT_SCALE, label_color, OVERLAY_THICKNESS)
 
     return overlay_frame
 
+def mjpeg_part(frame_data: np.ndarray):
+    """Multipart chunks for one encoded frame; the JPEG goes out as a view of the encoder's buffer, uncopied"""
+    return (b'--frame\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n' % frame_data.size,
+            memoryview(frame_data.reshape(-1)), b'\r\n')
+
+class LatestFrame:
+    """Single-slot handoff from a capture loop to an MJPEG response: a new frame replaces an untaken one"""
+    def __init__(self):
+        self.frame = None
+        self.ready = asyncio.Event()
 
-async def process_rtsp_with_ffmpeg_overlay(rtsp_url, output_queue, stop_event):
-    """Process RTSP stream with ffmpeg and overlay detection results"""
+    def put(self, frame_data: np.ndarray):
+        self.frame = frame_data
+        self.ready.set()
+
+    async def get(self, timeout: float = 1.0) -> Optional[np.ndarray]:
+        """Wait for a frame newer than the last one taken; None if none arrives within timeout"""
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self.ready.clear()
+        return self.frame
+
+class RtspBroadcaster:
+    """One capture and detection pipeline per RTSP URL, shared by its overlay viewers and background recognition"""
+    def __init__(self, rtsp_url: str):
+        self.rtsp_url = rtsp_url
+        self.subscribers = set()
+        self.viewers = set()  # The subscribers that take frames
+        self.stop_event = asyncio.Event()
+        # The pipeline sees this object as its output and calls put() once per encoded frame
+        self.task = asyncio.create_task(process_rtsp_with_ffmpeg_overlay(rtsp_url, self, self.stop_event))
+
+    @property
+    def wants_frames(self) -> bool:
+        """Whether anyone takes frames; recognition alone needs no overlay or JPEG encode"""
+        return bool(self.viewers)
+
+    def subscribe(self, frames: bool = True):
+        """Join the pipeline; viewers get a LatestFrame slot, recognition-only subscribers a plain token"""
+        subscriber = LatestFrame() if frames else object()
+        self.subscribers.add(subscriber)
+        if frames:
+            self.viewers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        """Leave the pipeline; the last subscriber to leave stops it and releases the capture"""
+        self.subscribers.discard(subscriber)
+        self.viewers.discard(subscriber)
+        if not self.subscribers:
+            self.stop_event.set()
+            if rtsp_broadcasters.get(self.rtsp_url) is self:
+                del rtsp_broadcasters[self.rtsp_url]
+
+    def put(self, frame_data: np.ndarray):
+        # Every viewer gets the same encoded buffer; nothing downstream writes to it
+        for output_frames in self.viewers:
+            output_frames.put(frame_data)
+
+def get_rtsp_broadcaster(rtsp_url: str) -> RtspBroadcaster:
+    """The running broadcaster for rtsp_url, starting a new one if there is none or its pipeline has exited"""
+    broadcaster = rtsp_broadcasters.get(rtsp_url)
+    if broadcaster is None or broadcaster.task.done():
+        broadcaster = RtspBroadcaster(rtsp_url)
+        rtsp_broadcasters[rtsp_url] = broadcaster
+    return broadcaster
+
+def encode_overlay_frame(frame, faces):
+    """Draw overlays onto a frame the caller owns and JPEG-encode it in one step (blocking, runs in inference_executor)"""
+    if faces:
+        draw_detection_overlays_on_frame(frame, faces)
+    _, buffer = cv2.imencode('.jpg', frame, JPEG_ENCODE_PARAMS)
+    return buffer
+
+
+async def read_latest_frames(cap, latest_frame, frame_ready, frame_wanted, keep_reading):
+    """Grab frames as fast as the source delivers them; hand the worker the next one while frame_wanted is set"""
+    loop = asyncio.get_running_loop()
+    while keep_reading():
+        # Grab frame in thread to avoid blocking; grab() keeps the stream drained without the BGR conversion
+        ret = await loop.run_in_executor(None, cap.grab)
+        if not ret:
+            logger.warning("Failed to read frame from RTSP stream")
+            await asyncio.sleep(0.01)  # Reduced delay
+            continue
+        # Frames arriving while the worker is busy are skipped, never converted or backlogged
+        if not frame_wanted.is_set():
+            continue
+        ret, frame = await loop.run_in_executor(None, cap.retrieve)
+        if not ret:
+            continue
+        frame_wanted.clear()
+        latest_frame[0] = frame
+        frame_ready.set()
+
+async def process_rtsp_with_ffmpeg_overlay(rtsp_url, output_frames, stop_event):
+    """Process RTSP stream with ffmpeg and overlay detection results; output_frames is the URL's RtspBroadcaster"""
     print(f"🎬 Starting ffmpeg RTSP processing: {rtsp_url}")
 
     try:
         # Initialize capture in thread to avoid blocking
         loop = asyncio.get_event_loop()
-        cap = await loop.run_in_executor(None, cv2.VideoCapture, rtsp_url)
-        await loop.run_in_executor(None, cap.set, cv2.CAP_PROP_BUFFERSIZE, 1)
+        cap = await loop.run_in_executor(None, cv2.VideoCapture, rtsp_url, cv2.CAP_FFMPEG, RTSP_CAPTURE_PARAMS)
 
         if not cap.isOpened():
             print(f"❌ Failed to open RTSP stream for ffmpeg: {rtsp_url}")
@@ -578,71 +833,61 @@ async def process_rtsp_with_ffmpeg_overlay(rtsp_url, output_queue, stop_event):
         frame_count = 0
         detection_results_cache = []
 
+        # A reader task drains the source continuously and converts only the frame the worker is
+        # waiting for, so latency stays bounded when detection is slower than the source
+        running = True
+        def keep_running():
+            return running and not stop_event.is_set() and get_independent_detection_active()
+        latest_frame = [None]
+        frame_ready = asyncio.Event()
+        frame_wanted = asyncio.Event()
+        reader = asyncio.create_task(read_latest_frames(cap, latest_frame, frame_ready, frame_wanted, keep_running))
+
         # Keep detection running as long as it's marked active OR there are welcome screens waiting
-        while not stop_event.is_set() and get_independent_detection_active():
-            # Read frame in thread to avoid blocking
-            ret, frame = await loop.run_in_executor(None, cap.read)
-            if not ret:
-                print("⚠️ Failed to read frame from RTSP stream")
-                await asyncio.sleep(0.01)  # Reduced delay
+        while keep_running():
+            try:
+                frame_wanted.set()
+                await asyncio.wait_for(frame_ready.wait(), timeout=1.0)
+            except asyncio.TimeoutError:
                 continue
+            frame_ready.clear()
+            frame = latest_frame[0]
 
             frame_count += 1
 
-            # Run face detection every frame for higher frame rate
-            # RTSP streams need more responsive detection for better user experience
-            if True:  # Process every frame
+            # Run face detection on every DETECT_EVERY_N-th frame; the frames in between
+            # are drawn with the cached results, which keeps the stream smooth at a fraction of the CPU
+            if (frame_count - 1) % DETECT_EVERY_N == 0:
                 try:
-                    # Resize frame to consistent size like original PyQt5 implementation (800x600)
-                    # This ensures proper bounding box positioning and consistent performance
-                    display_frame = cv2.resize(frame, (800, 600))
-                    frame_features, faces = face_recognizer.recognize_face(display_frame)
+                    # Detection runs in the inference pool so the event loop keeps serving other clients
+                    # Cleared first, so a failed detection drops the old boxes instead of freezing them
+                    detection_results_cache = []
+                    frame_features, faces, matches = await loop.run_in_executor(
+                        inference_executor, run_camera_pipeline, frame, rtsp_url)
 
                     # Process detection results
-                    detection_results_cache = []
                     if faces is not None and len(faces) > 0:
-                        # Calculate scaling factors from display frame (800x600) back to original frame
-                        original_height, original_width = frame.shape[:2]
-                        scale_x = original_width / 800.0
-                        scale_y = original_height / 600.0
-
                         for i, face in enumerate(faces):
-                            x1, y1, w, h = face[:4].astype(int)
-                            x2, y2 = x1 + w, y1 + h
-
-                            # Scale bounding box back to original frame size
-                            x1_scaled = int(x1 * scale_x)
-                            y1_scaled = int(y1 * scale_y)
-                            x2_scaled = int(x2 * scale_x)
-                            y2_scaled = int(y2 * scale_y)
-
-                            result = {
-                                'bbox': [x1_scaled, y1_scaled, x2_scaled, y2_scaled],
-                                'confidence': float(face[14]) if len(face) > 14 else 0.0,
+                            # Boxes are already in original frame coordinates
+                            result = face_to_result(face)
+                            result.update({
                                 'recognized': False,
                                 'person_name': 'Unknown',
                                 'match_confidence': 0.0
-                            }
+                            })
 
                             # Check for face recognition match
-                            if i < len(frame_features) and face_recognizer.dictionary:
-                                feature = frame_features[i]
+                            if i < len(frame_features):
                                 best_match = None
-                                highest_score = 0
-
-                                for person_id, ref_feature in face_recognizer.dictionary.items():
-                                    score = face_recognizer.face_recognizer.match(feature, ref_feature)
-
-                                    if score > face_recognizer.thresold and score > highest_score:
-                                        highest_score = score
-                                        person_name = db.get_person_name(person_id)
-                                        person_title = db.get_person_title(person_id)
-                                        best_match = {
-                                            'person_id': person_id,
-                                            'person_name': person_name,
-                                            'person_title': person_title,
-                                            'confidence': float(score)
-                                        }
+                                if matches[i] is not None:
+                                    person_id, score = matches[i]
+                                    person_name, person_title = get_person_info(person_id)
+                                    best_match = {
+                                        'person_id': person_id,
+                                        'person_name': person_name,
+                                        'person_title': person_title,
+                                        'confidence': score
+                                    }
 
                                 if best_match:
                                     result.update({
@@ -662,7 +907,7 @@ async def process_rtsp_with_ffmpeg_overlay(rtsp_url, output_queue, stop_event):
                                         recognition_data = create_recognition_data(best_match, current_time)
 
                                         # Store latest recognition
-                                        latest_recognition.update(recognition_data)
+                                        set_latest_recognition(recognition_data)
 
                                         # Broadcast to welcome screens via SocketIO
                                         await broadcast_recognition_to_welcome_screens(person_name, recognition_data, "RTSP")
@@ -670,38 +915,28 @@ async def process_rtsp_with_ffmpeg_overlay(rtsp_url, output_queue, stop_event):
                             detection_results_cache.append(result)
 
                     # Send detection results to frontend for UI updates (sidebar panels) only if independent detection is active
-                    if detection_results_cache and get_independent_detection_active():
-                        for sid in detection_active.keys():
-                            asyncio.create_task(sio.emit('face_detection_result', {
-                                "faces": detection_results_cache,
-                                "timestamp": time.time(),
-                                "frame_size": {"width": frame.shape[1], "height": frame.shape[0]}
-                            }, to=sid))
+                    # One room emit encodes the results once for every detection client
+                    if detection_results_cache and detection_active and get_independent_detection_active():
+                        await sio.emit('face_detection_result', {
+                            "faces": detection_results_cache,
+                            "timestamp": time.time(),
+                            "frame_size": {"width": frame.shape[1], "height": frame.shape[0]}
+                        }, room=DETECTION_ROOM)
 
                 except Exception as e:
-                    print(f"❌ Error in face detection: {e}")
-
-            # Draw overlays on frame using cached detection results
-            if detection_results_cache:
-                frame = draw_detection_overlays_on_frame(frame, detection_results_cache)
-
-            # Encode frame as JPEG
-            _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
+                    logger.warning("Error in face detection: %s", e)
 
-            # Frame rate limiting for RTSP performance balance
-            # Reduced sleep for higher frame rate - targeting 15-20 FPS
-            await asyncio.sleep(0.02)
-
-            # Put frame in output queue
-            if not output_queue.full():
-                try:
-                    output_queue.put_nowait(buffer.tobytes())
-                except queue.Full:
-                    pass  # Skip frame if queue is full
-
-            # NO DELAY for successful frames - only sleep on failures above
+            # Draw overlays using cached detection results and encode as JPEG in one pool call;
+            # while only background recognition is subscribed there is no viewer, so it skips both
+            if output_frames.wants_frames:
+                output_frames.put(await loop.run_in_executor(
+                    inference_executor, encode_overlay_frame, frame, detection_results_cache))
 
+        # Let the reader finish its in-flight read before the capture is released under it
+        running = False
+        await reader
         cap.release()
+        face_recognizer.forget_track(rtsp_url)
         print("🛑 FFmpeg RTSP processing stopped")
 
     except Exception as e:
@@ -710,6 +945,26 @@ async def process_rtsp_with_ffmpeg_overlay(rtsp_url, output_queue, stop_event):
 
 
 
+def find_first_camera_index(max_index=10):
+    """Index of the first available camera, or None (blocking, run it in an executor)"""
+    # Linux lists capture devices in sysfs, so no driver has to negotiate a stream just to be counted
+    sysfs_dir = '/sys/class/video4linux'
+    if os.path.isdir(sysfs_dir):
+        indices = sorted(int(name[5:]) for name in os.listdir(sysfs_dir)
+                         if name.startswith('video') and name[5:].isdigit())
+        return indices[0] if indices else None
+    # Elsewhere probe in order and stop at the first device that opens; isOpened() proves it exists
+    for i in range(max_index):
+        try:
+            test_cap = cv2.VideoCapture(i, cv2.CAP_AVFOUNDATION)
+            opened = test_cap.isOpened()
+            test_cap.release()
+            if opened:
+                return i
+        except Exception:
+            pass
+    return None
+
 # Simple camera testing without enumeration
 def test_single_camera(index):
     """Test a single camera index"""
@@ -724,24 +979,16 @@ def test_single_camera(index):
     except:
         return False
 
-# Load RTSP settings
-def load_rtsp_settings():
-    try:
-        with open('system/rtspin.pkl', 'rb') as f:
-            settings = pickle.load(f)
-            return settings.get('rtsp_url', '')
-    except:
-        return ''
-
-def save_rtsp_settings(rtsp_url):
+def probe_camera(source):
+    """(opened, frame_read) for a camera index or URL (blocking, run it in an executor)"""
+    cap = cv2.VideoCapture(source)
     try:
-        settings = {'rtsp_url': rtsp_url}
-        os.makedirs('system', exist_ok=True)
-        with open('system/rtspin.pkl', 'wb') as f:
-            pickle.dump(settings, f)
-        return True
-    except:
-        return False
+        if not cap.isOpened():
+            return False, False
+        ret, frame = cap.read()
+        return True, ret and frame is not None
+    finally:
+        cap.release()
 
 # Pydantic models
 class LoginRequest(BaseModel):
@@ -831,21 +1078,24 @@ async def change_admin_password(request: AdminPasswordChange):
 async def get_people():
     """Get all registered people with complete information"""
     try:
-        person_ids = db.get_all_person_ids()
         people = []
 
-        for person_id in person_ids:
-            person_name = db.get_person_name(person_id)
-            person_title = db.get_person_title(person_id)
+        # Reference image mtimes from one directory scan instead of two stat calls per person
+        image_mtimes = {}
+        if os.path.isdir('images'):
+            with os.scandir('images') as it:
+                image_mtimes = {e.name[:-4]: int(e.stat().st_mtime) for e in it if e.name.endswith('.png')}
+
+        # person_cache mirrors the PERSON table, so listing people needs no query
+        for person_id, (person_name, person_title) in person_cache.items():
             if person_name:
                 # Check if reference image exists
-                image_path = f'images/{person_id}.png'
-                has_image = os.path.exists(image_path)
+                file_mtime = image_mtimes.get(person_id)
+                has_image = file_mtime is not None
 
                 # Add timestamp for cache busting
                 image_url = None
                 if has_image:
-                    file_mtime = int(os.path.getmtime(image_path))
                     image_url = f'/api/people/{person_id}/image?t={file_mtime}'
 
                 people.append({
@@ -871,20 +1121,10 @@ async def register_person(request: personRegistration):
         # Generate a unique UUID for the person
         person_id = str(uuid.uuid4())
 
-        # Decode base64 image
-        if request.image_data.startswith('data:image'):
-            image_data = request.image_data.split(',')[1]
-        else:
-            image_data = request.image_data
-
-        image_bytes = base64.b64decode(image_data)
-        image = Image.open(BytesIO(image_bytes))
-
-        # Convert to OpenCV format
-        image_cv = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-
-        # Use the face recognizer to detect faces
-        _, faces = face_recognizer.recognize_face(image_cv, f"{person_id}.png")
+        # Decode the image and detect faces on it, off the event loop
+        loop = asyncio.get_running_loop()
+        image_bytes, image_cv, features, faces = await loop.run_in_executor(
+            inference_executor, run_upload_pipeline, request.image_data)
 
         if faces is None or len(faces) == 0:
             return {
@@ -908,13 +1148,13 @@ async def register_person(request: personRegistration):
                 'message': 'Unexpected ID collision occurred, please try again'
             }
 
-        # Save face image
-        os.makedirs('images', exist_ok=True)
-        image_path = f'images/{person_id}.png'
-        cv2.imwrite(image_path, image_cv)
+        # Save face image off the event loop
+        await loop.run_in_executor(None, save_face_image, f'images/{person_id}.png', image_bytes, image_cv)
 
-        # Recreate features dictionary with new person
-        face_recognizer.create_features()
+        # Add the new person to the recognition gallery
+        # Enroll the feature extracted during validation instead of detecting the face a second time
+        await loop.run_in_executor(inference_executor, face_recognizer.add_feature, person_id, features[0])
+        person_cache[person_id] = (request.person_name, request.person_title)
 
         return {
             'success': True,
@@ -935,9 +1175,10 @@ async def delete_person(person_id: str):
     """Delete a person"""
     try:
         result = db.delete_data_from_person(person_id)
+        person_cache.pop(person_id, None)
         if result:
-            # Recreate features dictionary after deletion
-            face_recognizer.create_features()
+            # Remove the person from the recognition gallery; it rewrites the feature cache, so off the event loop
+            await asyncio.get_running_loop().run_in_executor(None, face_recognizer.remove_user, person_id)
             return {
                 'success': True,
                 'message': 'person deleted successfully'
@@ -965,8 +1206,9 @@ async def delete_all_people():
             else:
                 failed_deletions.append(person_id)
 
-        # Recreate features dictionary after deletion
-        face_recognizer.create_features()
+        # Drop the deleted people from the recognition gallery, off the event loop
+        await asyncio.get_running_loop().run_in_executor(None, face_recognizer.remove_users, person_ids)
+        refresh_person_cache()
 
         if len(failed_deletions) == 0:
             return {
@@ -1014,50 +1256,29 @@ async def get_person_image(person_id: str):
 async def detect_faces(request: FaceDetectionRequest):
     """Detect and recognize faces in an image"""
     try:
-        # Decode base64 image
-        if request.image_data.startswith('data:image'):
-            image_data = request.image_data.split(',')[1]
-        else:
-            image_data = request.image_data
-
-        image_bytes = base64.b64decode(image_data)
-        image = Image.open(BytesIO(image_bytes))
-        frame = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-
-        # Use the face recognizer
-        endpoint_features, faces = face_recognizer.recognize_face(frame)
+        # Decode, detect and match in one hop off the event loop
+        loop = asyncio.get_running_loop()
+        endpoint_features, faces, matches = await loop.run_in_executor(
+            inference_executor, run_image_pipeline, request.image_data)
 
         results = []
         if faces is not None:
             for i, face in enumerate(faces):
                 # Get bounding box
-                x1, y1, w, h = face[:4].astype(int)
-                x2, y2 = x1 + w, y1 + h
-
-                result = {
-                    'bbox': [x1, y1, x2, y2],
-                    'confidence': float(face[14]) if len(face) > 14 else 0.0
-                }
+                result = face_to_result(face)
 
                 # Check if we have features and can match
-                if i < len(endpoint_features) and face_recognizer.dictionary:
-                    feature = endpoint_features[i]
+                if i < len(endpoint_features):
                     best_match = None
-                    highest_score = 0
-
-                    # Compare with all known faces
-                    for person_id, ref_feature in face_recognizer.dictionary.items():
-                        score = face_recognizer.face_recognizer.match(feature, ref_feature)
-                        if score > face_recognizer.thresold and score > highest_score:
-                            highest_score = score
-                            person_name = db.get_person_name(person_id)
-                            person_title = db.get_person_title(person_id)
-                            best_match = {
-                                'person_id': person_id,
-                                'person_name': person_name,
-                                'person_title': person_title,
-                                'confidence': float(score)
-                            }
+                    if matches[i] is not None:
+                        person_id, score = matches[i]
+                        person_name, person_title = get_person_info(person_id)
+                        best_match = {
+                            'person_id': person_id,
+                            'person_name': person_name,
+                            'person_title': person_title,
+                            'confidence': score
+                        }
 
                     if best_match:
                         result.update({
@@ -1098,20 +1319,17 @@ async def detect_faces(request: FaceDetectionRequest):
         }
 
 @app.get("/api/recognition/latest")
-async def get_latest_recognition():
-    """Get the latest face recognition result for welcome screens"""
+async def get_latest_recognition(request: Request):
+    """Get the latest face recognition result for welcome screens (fallback when SocketIO is down)"""
     try:
-        if latest_recognition:
-            return {
-                'success': True,
-                **latest_recognition
-            }
-        else:
-            return {
-                'success': True,
-                'user': None,
-                'timestamp': None
-            }
+        # Unchanged since the client's last poll: no body at all
+        if request.headers.get('if-none-match') == latest_recognition_etag:
+            return Response(status_code=304, headers={'ETag': latest_recognition_etag})
+        return Response(
+            content=latest_recognition_body,
+            media_type='application/json',
+            headers={'ETag': latest_recognition_etag, 'Cache-Control': 'no-cache'}
+        )
     except Exception as e:
         return {
             'success': False,
@@ -1147,12 +1365,6 @@ async def update_camera_settings(request: CameraSettings):
             rtsp_url=request.rtsp_url
         )
 
-        # Also save to legacy pickle file if RTSP
-        if request.source == 'rtsp' and request.rtsp_url:
-            save_rtsp_settings(request.rtsp_url)
-        elif request.source != 'rtsp':
-            save_rtsp_settings('')  # Clear RTSP settings
-
         if success:
             return {
                 'success': True,
@@ -1226,33 +1438,18 @@ async def test_camera(request: CameraSettings):
                 'message': f'Unsupported camera source: {request.source}. Only webcam, device, default, and rtsp are supported.'
             }
 
-        # Test the camera
-        cap = cv2.VideoCapture(source)
+        # Test the camera off the event loop; an unreachable source can block for seconds
+        opened, frame_read = await asyncio.get_running_loop().run_in_executor(None, probe_camera, source)
 
-        try:
-            if cap.isOpened():
-                ret, frame = cap.read()
-                if ret and frame is not None:
-                    print(f"✅ Camera test successful for source: {source}")
-                    return {
-                        'success': True,
-                        'message': f'Camera connection successful (source: {source})'
-                    }
-                else:
-                    print(f"❌ Camera opened but couldn't read frame from source: {source}")
-                    # In Docker/headless environments, this is expected for non-RTSP sources
-                    if request.source != 'rtsp':
-                        return {
-                            'success': True,
-                            'message': f'Camera configuration saved. Testing may be limited in Docker/headless environments. (source: {source})'
-                        }
-                    else:
-                        return {
-                            'success': False,
-                            'message': f'Camera opened but no video signal (source: {source})'
-                        }
+        if opened:
+            if frame_read:
+                print(f"✅ Camera test successful for source: {source}")
+                return {
+                    'success': True,
+                    'message': f'Camera connection successful (source: {source})'
+                }
             else:
-                print(f"❌ Couldn't open camera source: {source}")
+                print(f"❌ Camera opened but couldn't read frame from source: {source}")
                 # In Docker/headless environments, this is expected for non-RTSP sources
                 if request.source != 'rtsp':
                     return {
@@ -1262,10 +1459,21 @@ async def test_camera(request: CameraSettings):
                 else:
                     return {
                         'success': False,
-                        'message': f'Failed to open camera (source: {source})'
+                        'message': f'Camera opened but no video signal (source: {source})'
                     }
-        finally:
-            cap.release()
+        else:
+            print(f"❌ Couldn't open camera source: {source}")
+            # In Docker/headless environments, this is expected for non-RTSP sources
+            if request.source != 'rtsp':
+                return {
+                    'success': True,
+                    'message': f'Camera configuration saved. Testing may be limited in Docker/headless environments. (source: {source})'
+                }
+            else:
+                return {
+                    'success': False,
+                    'message': f'Failed to open camera (source: {source})'
+                }
 
     except Exception as e:
         print(f"❌ Camera test exception: {str(e)}")
@@ -1326,8 +1534,7 @@ async def update_display_settings(request: DisplaySettings):
                 }
 
                 print(f"📋 Broadcasting updated display settings to {len(welcome_screens)} welcome screens")
-                for screen_sid in welcome_screens.keys():
-                    await sio.emit('display_settings_updated', updated_settings, to=screen_sid)
+                await sio.emit('display_settings_updated', updated_settings, room=WELCOME_ROOM)
 
             return {
                 'success': True,
@@ -1342,6 +1549,31 @@ async def update_display_settings(request: DisplaySettings):
         raise HTTPException(status_code=500, detail=str(e))
 
 # Background image endpoints
+BACKGROUNDS_DIR = "images/backgrounds"
+
+def remove_background_files() -> bool:
+    """Remove every stored welcome background; returns True if any existed (blocking, run it in an executor)"""
+    removed = False
+    if os.path.exists(BACKGROUNDS_DIR):
+        for existing_file in os.listdir(BACKGROUNDS_DIR):
+            if existing_file.startswith("welcome_background"):
+                old_file_path = os.path.join(BACKGROUNDS_DIR, existing_file)
+                os.remove(old_file_path)
+                removed = True
+                print(f"🗑️ Removed existing background: {old_file_path}")
+    background_image_cache.update(path=None, mtime=None, contents=None)
+    return removed
+
+def replace_background_file(file_path: str, contents: bytes) -> bool:
+    """Swap the stored welcome background for new contents; returns True if one was replaced (blocking)"""
+    os.makedirs(BACKGROUNDS_DIR, exist_ok=True)
+    replaced_existing = remove_background_files()
+    with open(file_path, "wb") as f:
+        f.write(contents)
+    # Prime the cache with the upload so the welcome screens' first fetch doesn't read it back from disk
+    background_image_cache.update(path=file_path, mtime=os.path.getmtime(file_path), contents=contents)
+    return replaced_existing
+
 @app.post("/api/display/upload-background")
 async def upload_background_image(file: UploadFile = File(...)):
     """Upload a background image for the welcome screen"""
@@ -1365,32 +1597,12 @@ async def upload_background_image(file: UploadFile = File(...)):
                 'message': f'Invalid file type. Allowed types: {", ".join(allowed_types)}'
             }
 
-        # Create backgrounds directory if it doesn't exist
-        os.makedirs("images/backgrounds", exist_ok=True)
-
-        # Remove any existing background images first
-        backgrounds_dir = "images/backgrounds"
-        replaced_existing = False
-        if os.path.exists(backgrounds_dir):
-            for existing_file in os.listdir(backgrounds_dir):
-                if existing_file.startswith("welcome_background"):
-                    old_file_path = os.path.join(backgrounds_dir, existing_file)
-                    os.remove(old_file_path)
-                    replaced_existing = True
-                    print(f"🗑️ Removed existing background: {old_file_path}")
-
-        # Read and save the file
+        # Read the upload, then replace the stored background off the event loop
         contents = await file.read()
-
-        # Save to file system with new file
         file_extension = file.filename.split('.')[-1]
         file_path = f"images/backgrounds/welcome_background.{file_extension}"
-        with open(file_path, "wb") as f:
-            f.write(contents)
-
-        # Convert to base64 for immediate use (but don't store in config)
-        image_base64 = base64.b64encode(contents).decode('utf-8')
-        image_data_url = f"data:{file.content_type};base64,{image_base64}"
+        replaced_existing = await asyncio.get_running_loop().run_in_executor(
+            None, replace_background_file, file_path, contents)
 
         # Store only the file path in config
         config_manager.set_display_config(
@@ -1398,22 +1610,21 @@ async def upload_background_image(file: UploadFile = File(...)):
             background_image=file_path
         )
 
-        # Broadcast new background image to all connected welcome screens
-        if welcome_screens:
-            for screen_sid in welcome_screens.keys():
-                await sio.emit('background_image_data', {
-                    'backgroundImage': image_data_url,
-                    'useBackgroundImage': True
-                }, to=screen_sid)
-
         # Add cache buster to force refresh
-        import time
         cache_buster = int(time.time() * 1000)
+        image_url = f'/api/display/background-image?t={cache_buster}'
+
+        # Broadcast only the new image's URL; each welcome screen fetches the file once over HTTP
+        # instead of every screen's socket carrying a copy of the whole upload
+        await sio.emit('background_image_data', {
+            'backgroundImageUrl': image_url,
+            'useBackgroundImage': True
+        }, room=WELCOME_ROOM)
 
         return {
             'success': True,
             'message': 'Background image replaced successfully' if replaced_existing else 'Background image uploaded successfully',
-            'image_url': f'/api/display/background-image?t={cache_buster}'
+            'image_url': image_url
         }
     except Exception as e:
         print(f"❌ Upload error: {e}")
@@ -1424,12 +1635,8 @@ async def upload_background_image(file: UploadFile = File(...)):
 async def delete_background_image():
     """Delete the current background image"""
     try:
-        # Delete background images
-        backgrounds_dir = "images/backgrounds"
-        if os.path.exists(backgrounds_dir):
-            for file in os.listdir(backgrounds_dir):
-                if file.startswith("welcome_background"):
-                    os.remove(os.path.join(backgrounds_dir, file))
+        # Delete background images off the event loop
+        await asyncio.get_running_loop().run_in_executor(None, remove_background_files)
 
         # Update config to clear background image settings
         config_manager.set_display_config(
@@ -1437,13 +1644,11 @@ async def delete_background_image():
             background_image=None
         )
 
-        # Broadcast to all connected welcome screens that background was deleted
-        if welcome_screens:
-            for screen_sid in welcome_screens.keys():
-                await sio.emit('background_image_data', {
-                    'backgroundImage': None,
-                    'useBackgroundImage': False
-                }, to=screen_sid)
+        # Broadcast to all connected welcome screens that background was deleted, in one room emit
+        await sio.emit('background_image_data', {
+            'backgroundImage': None,
+            'useBackgroundImage': False
+        }, room=WELCOME_ROOM)
 
         return {
             'success': True,
@@ -1456,40 +1661,36 @@ async def delete_background_image():
 async def get_background_image():
     """Get the current background image if it exists"""
     try:
-        backgrounds_dir = os.path.join("images", "backgrounds")
-        if os.path.exists(backgrounds_dir):
-            for file in os.listdir(backgrounds_dir):
-                if file.startswith("welcome_background"):
-                    file_path = os.path.join(backgrounds_dir, file)
-                    # Determine MIME type based on file extension
-                    mime_type = "image/jpeg"
-                    if file.lower().endswith('.png'):
-                        mime_type = "image/png"
-                    elif file.lower().endswith('.gif'):
-                        mime_type = "image/gif"
-
-                    return FileResponse(
-                        file_path,
-                        media_type=mime_type,
-                        headers={
-                            "Cache-Control": "public, max-age=3600",
-                            "Access-Control-Allow-Origin": "*"
-                        }
-                    )
-
-        raise HTTPException(status_code=404, detail="No background image found")
+        # The configured path names the current file, so no directory scan; bytes come from the mtime-keyed
+        # cache, checked in the default executor since a miss reads the whole file
+        file_path = config_manager.get_display_config().get('background_image')
+        contents = None
+        if file_path:
+            contents = await asyncio.get_running_loop().run_in_executor(None, read_background_image, file_path)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    if contents is None:
+        raise HTTPException(status_code=404, detail="No background image found")
+    return Response(
+        contents,
+        media_type=background_mime_type(file_path),
+        headers={
+            "Cache-Control": "public, max-age=3600",
+            "Access-Control-Allow-Origin": "*"
+        }
+    )
+
 # System endpoints
 @app.get("/api/system/status")
 async def get_system_status():
     """Get system status"""
     try:
-        people = await get_people()
+        # Count straight from person_cache; get_people would also scan the images directory
+        total_people = sum(1 for person_name, _ in person_cache.values() if person_name)
         return {
             "status": "online",
-            "total_people": people.get("total", 0),
+            "total_people": total_people,
             "models_loaded": True,
             "database_connected": True
         }
@@ -1501,10 +1702,15 @@ async def get_system_status():
             "database_connected": False
         }
 
+@lru_cache(maxsize=1)
+def health_timestamp(second: int) -> tuple:
+    """Date and time for the health check, formatted once per wall-clock second"""
+    return get_current_datetime_other_format()
+
 @app.get("/api/system/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "timestamp": get_current_datetime_other_format()}
+    return {"status": "healthy", "timestamp": health_timestamp(int(time.time()))}
 
 @app.get("/api/system/detection-status")
 async def get_detection_status():
@@ -1566,36 +1772,30 @@ async def rtsp_stream_with_overlay(request: Request):
 
     print(f"🎬 Starting FFmpeg RTSP stream with overlays {stream_id} from: {rtsp_url}")
 
-    # Create a queue for frame data
-    frame_queue = queue.Queue(maxsize=10)
-    stop_event = asyncio.Event()
+    # Viewers of the same URL share one capture, decode and detection pipeline; each gets its
+    # own single-slot handoff so a slow client only skips frames
+    broadcaster = get_rtsp_broadcaster(rtsp_url)
+    output_frames = broadcaster.subscribe()
 
-    # Start the background processing thread
-    asyncio.create_task(
-        process_rtsp_with_ffmpeg_overlay(rtsp_url, frame_queue, stop_event)
-    )
-
-    def generate_frames():
+    async def generate_frames():
         try:
             while ffmpeg_streams.get(stream_id, False) and get_independent_detection_active():
                 try:
-                    # Get frame from queue with minimal timeout for responsiveness
-                    frame_data = frame_queue.get(timeout=0.01)
+                    frame_data = await output_frames.get()
+                    if frame_data is None:
+                        continue
 
                     # Yield frame in multipart format
-                    yield (b'--frame\r\n'
-                           b'Content-Type: image/jpeg\r\n\r\n' + frame_data + b'\r\n')
+                    for chunk in mjpeg_part(frame_data):
+                        yield chunk
 
-                except queue.Empty:
-                    # If no frame available, continue
-                    continue
                 except Exception as e:
                     print(f"❌ Error in frame generation: {e}")
                     break
 
         finally:
             # Cleanup
-            stop_event.set()
+            broadcaster.unsubscribe(output_frames)
             if stream_id in ffmpeg_streams:
                 del ffmpeg_streams[stream_id]
             print(f"🛑 FFmpeg stream {stream_id} closed")
@@ -1618,31 +1818,30 @@ async def webcam_stream_with_overlay(request: Request):
     if source not in ['webcam', 'device', 'default']:
         raise HTTPException(status_code=400, detail="Webcam, device, or default not configured as source")
 
-    # Create queue for frames
-    frame_queue = queue.Queue(maxsize=10)
+    # Single-slot handoff for frames: the viewer always gets the newest frame
+    output_frames = LatestFrame()
 
     # Mark stream as active
     webcam_streams[stream_id] = True
     print(f"📹 Starting webcam stream with overlay {stream_id}")
 
-    # Start the background processing thread
+    # Start the background processing task
     asyncio.create_task(
-        process_webcam_with_overlay(frame_queue, stream_id)
+        process_webcam_with_overlay(output_frames, stream_id)
     )
 
-    def generate_frames():
+    async def generate_frames():
         try:
             while webcam_streams.get(stream_id, False) and get_independent_detection_active():
                 try:
-                    # Get frame from queue with minimal timeout
-                    frame_data = frame_queue.get(timeout=0.01)
+                    frame_data = await output_frames.get()
+                    if frame_data is None:
+                        continue
 
                     # Yield frame in multipart format
-                    yield (b'--frame\r\n'
-                           b'Content-Type: image/jpeg\r\n\r\n' + frame_data + b'\r\n')
+                    for chunk in mjpeg_part(frame_data):
+                        yield chunk
 
-                except queue.Empty:
-                    continue
                 except Exception as e:
                     print(f"❌ Error in webcam frame generation: {e}")
                     break
@@ -1658,7 +1857,7 @@ async def webcam_stream_with_overlay(request: Request):
         media_type="multipart/x-mixed-replace; boundary=frame"
     )
 
-async def process_webcam_with_overlay(output_queue, stream_id):
+async def process_webcam_with_overlay(output_frames, stream_id):
     """Process webcam stream with face detection overlays"""
     print(f"🎥 Starting webcam processing with overlays")
 
@@ -1676,20 +1875,7 @@ async def process_webcam_with_overlay(output_queue, stream_id):
                 # Try to find a working camera index dynamically
                 # Since browser provides device IDs but backend needs indices,
                 # we'll try available camera indices until we find one that works
-                camera_index = None
-
-                # Test cameras 0-9 to find available ones
-                for i in range(10):
-                    try:
-                        test_cap = cv2.VideoCapture(i, cv2.CAP_AVFOUNDATION)
-                        if test_cap.isOpened():
-                            ret, _ = test_cap.read()
-                            if ret:
-                                if camera_index is None:  # Use first available camera as fallback
-                                    camera_index = i
-                        test_cap.release()
-                    except:
-                        pass
+                camera_index = await asyncio.get_running_loop().run_in_executor(None, find_first_camera_index)
 
                 if camera_index is None:
                     camera_index = 0  # Fallback to default
@@ -1734,60 +1920,37 @@ async def process_webcam_with_overlay(output_queue, stream_id):
             frame_count += 1
 
             try:
-                # Resize frame to consistent size like original PyQt5 implementation (800x600)
-                # This ensures proper bounding box positioning and consistent performance
-                display_frame = cv2.resize(frame, (800, 600))
-
                 # Run face detection every frame for webcam (maximum responsiveness)
                 # Webcam is typically local and lower resolution, so can handle full FPS detection
-                frame_features, faces = face_recognizer.recognize_face(display_frame)
+                # Cleared first, so a failed detection drops the old boxes instead of freezing them
+                detection_results_cache = []
+                frame_features, faces, matches = await loop.run_in_executor(
+                    inference_executor, run_camera_pipeline, frame, stream_id)
 
                 # Process detection results
-                detection_results_cache = []
                 if faces is not None and len(faces) > 0:
                    # print(f"🔍 BACKGROUND WEBCAM: Detected {len(faces)} faces in frame {frame_count}")
-                    # Calculate scaling factors from display frame (800x600) back to original frame
-                    original_height, original_width = frame.shape[:2]
-                    scale_x = original_width / 800.0
-                    scale_y = original_height / 600.0
-
                     for i, face in enumerate(faces):
-                        x1, y1, w, h = face[:4].astype(int)
-                        x2, y2 = x1 + w, y1 + h
-
-                        # Scale bounding box back to original frame size
-                        x1_scaled = int(x1 * scale_x)
-                        y1_scaled = int(y1 * scale_y)
-                        x2_scaled = int(x2 * scale_x)
-                        y2_scaled = int(y2 * scale_y)
-
-                        result = {
-                            'bbox': [x1_scaled, y1_scaled, x2_scaled, y2_scaled],
-                            'confidence': float(face[14]) if len(face) > 14 else 0.0,
+                        # Boxes are already in original frame coordinates
+                        result = face_to_result(face)
+                        result.update({
                             'recognized': False,
                             'person_name': 'Unknown',
                             'match_confidence': 0.0
-                        }
+                        })
 
                         # Check for face recognition match
-                        if i < len(frame_features) and face_recognizer.dictionary:
-                            feature = frame_features[i]
+                        if i < len(frame_features):
                             best_match = None
-                            highest_score = 0
-
-                            for person_id, ref_feature in face_recognizer.dictionary.items():
-                                score = face_recognizer.face_recognizer.match(feature, ref_feature)
-
-                                if score > face_recognizer.thresold and score > highest_score:
-                                    highest_score = score
-                                    person_name = db.get_person_name(person_id)
-                                    person_title = db.get_person_title(person_id)
-                                    best_match = {
-                                        'person_id': person_id,
-                                        'person_name': person_name,
-                                        'person_title': person_title,
-                                        'confidence': float(score)
-                                    }
+                            if matches[i] is not None:
+                                person_id, score = matches[i]
+                                person_name, person_title = get_person_info(person_id)
+                                best_match = {
+                                    'person_id': person_id,
+                                    'person_name': person_name,
+                                    'person_title': person_title,
+                                    'confidence': score
+                                }
 
                             if best_match:
                                 result.update({
@@ -1807,7 +1970,7 @@ async def process_webcam_with_overlay(output_queue, stream_id):
                                     recognition_data = create_recognition_data(best_match, current_time)
 
                                     # Store latest recognition
-                                    latest_recognition.update(recognition_data)
+                                    set_latest_recognition(recognition_data)
 
                                     # Broadcast to welcome screens via SocketIO
                                     await broadcast_recognition_to_welcome_screens(person_name, recognition_data, "WEBCAM")
@@ -1815,36 +1978,28 @@ async def process_webcam_with_overlay(output_queue, stream_id):
                         detection_results_cache.append(result)
 
                 # Send detection results to any connected Socket.IO clients for UI updates only if independent detection is active
-                if detection_results_cache and get_independent_detection_active():
-                    for sid in detection_active.keys():
-                        asyncio.create_task(sio.emit('face_detection_result', {
-                            "faces": detection_results_cache,
-                            "timestamp": time.time(),
-                            "frame_size": {"width": frame.shape[1], "height": frame.shape[0]}
-                        }, to=sid))
+                if detection_results_cache and detection_active and get_independent_detection_active():
+                    await sio.emit('face_detection_result', {
+                        "faces": detection_results_cache,
+                        "timestamp": time.time(),
+                        "frame_size": {"width": frame.shape[1], "height": frame.shape[0]}
+                    }, room=DETECTION_ROOM)
 
             except Exception as e:
-                print(f"❌ Error in webcam face detection: {e}")
-
-            # Draw overlays on frame
-            if detection_results_cache:
-                frame = draw_detection_overlays_on_frame(frame, detection_results_cache)
+                logger.warning("Error in webcam face detection: %s", e)
 
-            # Encode frame as JPEG
-            _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-
-            # Put frame in output queue
-            if not output_queue.full():
-                try:
-                    output_queue.put_nowait(buffer.tobytes())
-                except queue.Full:
-                    pass  # Skip frame if queue is full
+            # Draw overlays using cached detection results and encode as JPEG in one pool call;
+            # background recognition has no viewer, so it skips both
+            if output_frames is not None:
+                output_frames.put(await loop.run_in_executor(
+                    inference_executor, encode_overlay_frame, frame, detection_results_cache))
 
             # Frame rate limiting for performance balance (inspired by original PyQt5 timing)
             # Original used 200ms timer (5 FPS), we use 33ms for 30 FPS webcam responsiveness
             await asyncio.sleep(0.033)
 
         cap.release()
+        face_recognizer.forget_track(stream_id)
         print("🛑 Webcam processing stopped")
 
     except Exception as e:
@@ -2000,13 +2155,16 @@ async def start_background_rtsp_for_welcome_screens():
 
     print(f"🎬 Starting background RTSP processing for welcome screens: {rtsp_url}")
 
-    # Create a dummy queue since we don't need video output, just recognition events
-    dummy_queue = queue.Queue(maxsize=1)  # Small queue since we're not outputting video
-    stop_event = asyncio.Event()
-
-    # Use the consolidated auto-retry wrapper
+    # Subscribe to the URL's shared pipeline without taking frames, so overlay viewers and welcome-screen
+    # recognition use one capture and one detection loop; frames are only encoded while a viewer is watching
     async def rtsp_process_func():
-        await process_rtsp_with_ffmpeg_overlay(rtsp_url, dummy_queue, stop_event)
+        broadcaster = get_rtsp_broadcaster(rtsp_url)
+        subscriber = broadcaster.subscribe(frames=False)
+        try:
+            # Shielded: cancelling this wait must not cancel the pipeline viewers may still be using
+            await asyncio.shield(broadcaster.task)
+        finally:
+            broadcaster.unsubscribe(subscriber)
 
     await run_with_auto_retry(rtsp_process_func, stream_id, "RTSP")
 
@@ -2017,12 +2175,11 @@ async def start_background_webcam_for_welcome_screens():
 
     print(f"📹 Starting background webcam processing for welcome screens")
 
-    # Create a dummy queue since we don't need video output, just recognition events
-    dummy_queue = queue.Queue(maxsize=1)  # Small queue since we're not outputting video
+    # No video output is needed, just recognition events, so frames are never encoded
 
     # Use the consolidated auto-retry wrapper
     async def webcam_process_func():
-        await process_webcam_with_overlay(dummy_queue, stream_id)
+        await process_webcam_with_overlay(None, stream_id)
 
     await run_with_auto_retry(webcam_process_func, stream_id, "WEBCAM")
 
@@ -2053,11 +2210,16 @@ if __name__ == "__main__":
 
     try:
         # Run the server with SocketIO
+        # "auto" picks uvloop and httptools when they are installed (see requirements.txt).
+        # Set API_RELOAD=0 in production: the reloader runs the app in a watched subprocess.
         uvicorn.run(
             "api:socket_app",  # Use the SocketIO app instead of FastAPI app directly
             host="0.0.0.0",
             port=8000,
-            reload=True,
+            loop="auto",
+            http="auto",
+            reload=os.environ.get('API_RELOAD', '1') == '1',
+            workers=1,  # SocketIO and detection state live in module globals
             log_level="info"
         )
     except KeyboardInterrupt:
@@ -152,15 +152,20 @@ class ConfigManager:
             },
             'recognition': {
                 'threshold': 0.5,
-                'draw_boxes': True
+                'draw_boxes': True,
+                'quantize_gallery': False,
+                'detection_max_side': 640,
+                'recog_every_n': 4,
+                'detect_every_n': 3,
+                'model_workers': 2,
+                'detector_input_size': [640, 360]
             },
             'detection': {
                 'active': False
             },
             'system': {
                 'database_path': 'system/Attendance.db',
-                'encodings_path': 'images/',
-                'rtsp_pickle': 'system/rtspin.pkl'
+                'encodings_path': 'images/'
             }
         }
 